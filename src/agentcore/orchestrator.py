@@ -692,19 +692,24 @@ class SirpiOrchestrator:
             gcs_storage = get_gcs_storage()
             
             # Delete old files first to avoid mixing AWS and GCP templates
-            deleted_count = gcs_storage.delete_repository_files(owner, repo)
+            deleted_count = await gcs_storage.delete_repository_files_async(owner, repo)
             if deleted_count > 0:
                 log("Storage", f"Cleared {deleted_count} old files from storage", stage="upload")
             
-            gcs_keys = []
+            # Upload concurrently - each file is an independent GCS request
+            # GCS path: {owner}/{repo}/{filepath}
+            gcs_keys = await asyncio.gather(
+                *[
+                    gcs_storage.upload_file_async(
+                        content=file_data["content"],
+                        file_path=f"{owner}/{repo}/{file_data['path']}",
+                        content_type="text/plain",
+                    )
+                    for file_data in files_to_upload
+                ]
+            )
             
             for file_data in files_to_upload:
-                # Create GCS path: {owner}/{repo}/{filepath}
-                gcs_path = f"{owner}/{repo}/{file_data['path']}"
-                gcs_key = gcs_storage.upload_file(
-                    content=file_data["content"], file_path=gcs_path, content_type="text/plain"
-                )
-                gcs_keys.append(gcs_key)
                 file_size_kb = len(file_data["content"]) // 1024
                 log("Storage", f"Uploaded {file_data['path']} ({file_size_kb}KB)", stage="upload")
             
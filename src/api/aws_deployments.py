@@ -15,7 +15,7 @@ from src.services.gcs_storage import get_gcs_storage
 from src.utils.clerk_auth import get_current_user_id
 from src.core.config import settings
 from src.api.deployment_logs import register_deployment, send_log, send_completion
-from src.api.env_vars import get_decrypted_env_vars
+from src.api.env_vars import render_env_vars_tfvars
 import asyncio
 
 router = APIRouter(prefix="/deployment", tags=["AWS Deployment"])
@@ -239,7 +239,7 @@ async def plan_aws_deployment(
             )
 
         # Get environment variables
-        env_vars = await get_decrypted_env_vars(project_id)
+        env_vars_tfvars, _ = await render_env_vars_tfvars(project_id)
 
         # Register for SSE streaming
         register_deployment(project_id)
@@ -291,15 +291,8 @@ app_name = "{app_name}"
 ecr_repository_name = "{ecr_repository_name}"
 '''
 
-            if env_vars:
-                # Convert env vars to Terraform map format
-                env_vars_tf = "{\n"
-                for key, value in env_vars.items():
-                    # Escape quotes in values
-                    escaped_value = value.replace('"', '\\"')
-                    env_vars_tf += f'  "{key}" = "{escaped_value}"\n'
-                env_vars_tf += "}"
-                tfvars_content += f"app_env_vars = {env_vars_tf}\n"
+            if env_vars_tfvars:
+                tfvars_content += f"{env_vars_tfvars}\n"
 
             await sandbox.write_file(f"{tf_dir}/terraform.tfvars", tfvars_content)
             sandbox._log("Wrote terraform.tfvars")
@@ -386,7 +379,7 @@ async def apply_aws_deployment(
                     break
 
         # Get environment variables
-        env_vars = await get_decrypted_env_vars(project_id)
+        env_vars_tfvars, _ = await render_env_vars_tfvars(project_id)
 
         # Register for SSE streaming
         register_deployment(project_id)
@@ -430,19 +423,13 @@ async def apply_aws_deployment(
 app_name = "{app_name}"
 ecr_repository_name = "{ecr_repository_name}"
 '''
-            if env_vars:
-                env_vars_tf = "{\n"
-                for key, value in env_vars.items():
-                    escaped_value = value.replace('"', '\\"')
-                    env_vars_tf += f'  "{key}" = "{escaped_value}"\n'
-                env_vars_tf += "}"
-                tfvars_content += f"app_env_vars = {env_vars_tf}\n"
+            if env_vars_tfvars:
+                tfvars_content += f"{env_vars_tfvars}\n"
 
             await sandbox.write_file(f"{tf_dir}/terraform.tfvars", tfvars_content)
 
-            # Initialize and apply
-            await aws_service.terraform_init(tf_dir)
-            outputs = await aws_service.terraform_apply(tf_dir, "terraform.tfvars")
+            # Initialize, plan and apply in one sandbox command
+            outputs = await aws_service.terraform_deploy(tf_dir, "terraform.tfvars")
 
         # Store logs
         duration = time.time() - start_time
@@ -539,7 +526,7 @@ async def destroy_aws_deployment(
                     image_uri = match.group(1)
                     break
 
-        env_vars = await get_decrypted_env_vars(project_id)
+        env_vars_tfvars, _ = await render_env_vars_tfvars(project_id)
 
         # Register for SSE streaming
         register_deployment(project_id)
@@ -583,13 +570,8 @@ async def destroy_aws_deployment(
 app_name = "{app_name}"
 ecr_repository_name = "{ecr_repository_name}"
 '''
-            if env_vars:
-                env_vars_tf = "{\n"
-                for key, value in env_vars.items():
-                    escaped_value = value.replace('"', '\\"')
-                    env_vars_tf += f'  "{key}" = "{escaped_value}"\n'
-                env_vars_tf += "}"
-                tfvars_content += f"app_env_vars = {env_vars_tf}\n"
+            if env_vars_tfvars:
+                tfvars_content += f"{env_vars_tfvars}\n"
 
             await sandbox.write_file(f"{tf_dir}/terraform.tfvars", tfvars_content)
 
@@ -598,7 +580,7 @@ ecr_repository_name = "{ecr_repository_name}"
             await aws_service.terraform_destroy(tf_dir, "terraform.tfvars")
 
             # Optional: Cleanup state file
-            aws_service.state_manager.cleanup_state(project["name"])
+            await asyncio.to_thread(aws_service.state_manager.cleanup_state, project["name"])
 
         # Store logs
         duration = time.time() - start_time
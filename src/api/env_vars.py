@@ -5,7 +5,10 @@ Manages encrypted storage of user's application environment variables.
 
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+import asyncio
+import io
+import json
 import logging
 
 from src.utils.clerk_auth import get_current_user_id
@@ -80,8 +83,22 @@ async def save_project_env_vars(
         if not project or project["user_id"] != user_id:
             raise HTTPException(status_code=404, detail="Project not found")
 
-        # Save each env var (will be encrypted)
+        # Ciphertexts use a random nonce and differ on every encryption, so unchanged rows
+        # can only be detected by comparing plaintext - skip them to avoid rewriting tuples
+        existing = {var["key"]: var for var in await get_env_vars_for_project(project_id)}
+
+        # Save each changed env var (will be encrypted)
+        written = 0
         for env_var in request.env_vars:
+            current = existing.get(env_var.key)
+            if (
+                current
+                and current["value"] == env_var.value
+                and current["is_secret"] == env_var.is_secret
+                and current.get("description") == env_var.description
+            ):
+                continue
+
             await save_env_var(
                 project_id=project_id,
                 key=env_var.key,
@@ -89,8 +106,12 @@ async def save_project_env_vars(
                 is_secret=env_var.is_secret,
                 description=env_var.description,
             )
+            written += 1
 
-        logger.info(f"Saved {len(request.env_vars)} env vars for project {project_id}")
+        logger.info(
+            f"Saved {len(request.env_vars)} env vars for project {project_id} "
+            f"({written} changed)"
+        )
 
         return {"message": f"Saved {len(request.env_vars)} environment variables"}
 
@@ -108,6 +129,8 @@ async def upload_env_file(
     """
     Upload .env file and parse it into environment variables.
     """
+    from src.utils.encryption import encrypt_value
+
     try:
         # Verify project ownership
         project = supabase.get_project_by_id(project_id)
@@ -121,6 +144,9 @@ async def upload_env_file(
         # Parse .env file
         env_vars = parse_env_file(env_content)
 
+        # Encrypt each distinct value once (templated .env files repeat values a lot)
+        encrypted_values = {value: encrypt_value(value) for value in set(env_vars.values())}
+
         # Save parsed env vars
         for key, value in env_vars.items():
             await save_env_var(
@@ -128,6 +154,7 @@ async def upload_env_file(
                 key=key,
                 value=value,
                 is_secret=True,  # Default to secret for uploaded files
+                encrypted_value=encrypted_values[value],
             )
 
         logger.info(f"Uploaded and parsed {len(env_vars)} env vars from file")
@@ -251,12 +278,22 @@ async def get_env_vars_for_project(project_id: str) -> List[Dict]:
 
 
 async def save_env_var(
-    project_id: str, key: str, value: str, is_secret: bool = True, description: Optional[str] = None
+    project_id: str,
+    key: str,
+    value: str,
+    is_secret: bool = True,
+    description: Optional[str] = None,
+    encrypted_value: Optional[str] = None,
 ):
-    """Save or update an environment variable (encrypted)."""
+    """
+    Save or update an environment variable (encrypted).
+
+    Pass encrypted_value to reuse a ciphertext already computed for the same value.
+    """
     from src.utils.encryption import encrypt_value
 
-    encrypted_value = encrypt_value(value)
+    if encrypted_value is None:
+        encrypted_value = encrypt_value(value)
 
     try:
         with supabase.get_connection() as conn:
@@ -299,28 +336,52 @@ async def delete_project_env_var(project_id: str, key: str) -> bool:
         raise DatabaseError("Failed to delete environment variable")
 
 
-async def get_decrypted_env_vars(project_id: str) -> Dict[str, str]:
+async def render_env_vars_tfvars(project_id: str) -> Tuple[str, int]:
     """
-    Get all env vars for deployment (decrypted).
-    Used internally for terraform.tfvars generation.
-    """
-    from src.utils.encryption import decrypt_value
+    Render env vars for deployment as a terraform.tfvars `app_env_vars` map.
+    Rows are streamed from a server-side cursor and decrypted straight into the
+    output buffer, so no intermediate dict of decrypted values is built.
 
+    Returns:
+        Tuple of (tfvars snippet, variable count). Snippet is empty when there are none.
+    """
     try:
-        with supabase.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT key, value_encrypted
-                    FROM project_env_vars
-                    WHERE project_id = %s
-                    ORDER BY key
-                    """,
-                    (project_id,),
-                )
-                rows = cur.fetchall()
-
-                return {row["key"]: decrypt_value(row["value_encrypted"]) for row in rows}
+        return await asyncio.to_thread(_render_env_vars_tfvars, project_id)
     except Exception as e:
-        logger.error(f"Failed to get decrypted env vars: {e}")
+        logger.error(f"Failed to render env vars for tfvars: {e}")
         raise DatabaseError("Failed to retrieve environment variables")
+
+
+def _render_env_vars_tfvars(project_id: str) -> Tuple[str, int]:
+    """Blocking half of render_env_vars_tfvars (runs in a worker thread)."""
+    from src.utils.encryption import decrypt_value
+
+    buffer = io.StringIO()
+    count = 0
+
+    with supabase.get_connection() as conn:
+        with conn.cursor(name="env_vars_tfvars") as cur:
+            cur.itersize = 500
+            cur.execute(
+                """
+                SELECT key, value_encrypted
+                FROM project_env_vars
+                WHERE project_id = %s
+                ORDER BY key
+                """,
+                (project_id,),
+            )
+
+            for row in cur:
+                if not count:
+                    buffer.write("app_env_vars = {\n")
+                # JSON string literals are valid HCL strings (handles quote/backslash escaping)
+                key = json.dumps(row["key"])
+                value = json.dumps(decrypt_value(row["value_encrypted"]))
+                buffer.write(f"  {key} = {value}\n")
+                count += 1
+
+    if count:
+        buffer.write("}")
+
+    return buffer.getvalue(), count
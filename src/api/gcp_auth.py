@@ -2,8 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+import httpx
 import logging
 from datetime import datetime, timedelta
 from typing import Optional
@@ -12,12 +11,41 @@ from psycopg2.extras import Json
 from src.core.config import settings
 from src.utils.clerk_auth import get_current_user_id
 from src.services.supabase import supabase
+from src.utils.background import run_in_background
 from src.utils.encryption import encrypt_value as encrypt, decrypt_value as decrypt
-from src.utils.gcp_credentials_validator import check_gcp_credentials, CredentialStatus
+from src.utils.gcp_credentials_validator import (
+    auth_request,
+    check_gcp_credentials,
+    CredentialStatus,
+    invalidate_gcp_credentials_cache,
+)
 
 router = APIRouter(prefix="/gcp", tags=["GCP Auth"])
 logger = logging.getLogger(__name__)
 
+CLOUD_RESOURCE_MANAGER_PROJECTS_URL = "https://cloudresourcemanager.googleapis.com/v1/projects"
+
+
+def _store_refreshed_token(user_id: str, project_id: str, credentials: Credentials):
+    """Persist a refreshed access token."""
+    with supabase.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE gcp_credentials
+                SET access_token = %s,
+                    token_expiry = %s,
+                    updated_at = NOW()
+                WHERE user_id = %s AND project_id = %s
+                """,
+                (
+                    encrypt(credentials.token),
+                    credentials.expiry if credentials.expiry else None,
+                    user_id,
+                    project_id
+                )
+            )
+
 
 def get_oauth_flow():
     """Create OAuth flow instance"""
@@ -86,13 +114,14 @@ async def gcp_auth_callback(
     Exchange authorization code for tokens
     """
     try:
-        # Verify state (CSRF protection)
+        # Verify and consume state in one statement (CSRF protection, single use)
         with supabase.get_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
-                    SELECT * FROM oauth_states
+                    DELETE FROM oauth_states
                     WHERE user_id = %s AND state = %s
+                    RETURNING *
                     """,
                     (user_id, state)
                 )
@@ -106,9 +135,15 @@ async def gcp_auth_callback(
         flow.fetch_token(code=code)
         credentials = flow.credentials
         
-        # Fetch user's GCP projects
-        service = build('cloudresourcemanager', 'v1', credentials=credentials)
-        projects_response = service.projects().list().execute()
+        # Fetch user's GCP projects (single REST call - no discovery document)
+        timeout = httpx.Timeout(30.0, connect=10.0)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            response = await client.get(
+                CLOUD_RESOURCE_MANAGER_PROJECTS_URL,
+                headers={"Authorization": f"Bearer {credentials.token}"},
+            )
+            response.raise_for_status()
+            projects_response = response.json()
         
         user_projects = projects_response.get('projects', [])
         
@@ -168,12 +203,8 @@ async def gcp_auth_callback(
                 )
                 result = cur.fetchone()
                 credential_id = result['id']
-                
-                # Clean up state
-                cur.execute(
-                    "DELETE FROM oauth_states WHERE state = %s",
-                    (state,)
-                )
+        
+        invalidate_gcp_credentials_cache(user_id)
         
         logger.info(f"OAuth credentials stored for user {user_id}, project {gcp_project_id}")
         logger.info(f"GCP OAuth completed for user {user_id}, project {gcp_project_id}")
@@ -239,6 +270,8 @@ async def revoke_gcp_credentials(
                 (credential_id,)
             )
     
+    invalidate_gcp_credentials_cache(user_id)
+    
     logger.info(f"Revoked GCP credentials {credential_id} for user {user_id}")
     
     return {"status": "revoked"}
@@ -284,26 +317,12 @@ def get_gcp_credentials(user_id: str, project_id: str) -> Credentials:
     
     # Refresh if expired
     if credentials.expired and credentials.refresh_token:
-        credentials.refresh(Request())
+        credentials.refresh(auth_request)
         
-        # Update stored token
-        with supabase.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    UPDATE gcp_credentials
-                    SET access_token = %s,
-                        token_expiry = %s,
-                        updated_at = NOW()
-                    WHERE user_id = %s AND project_id = %s
-                    """,
-                    (
-                        encrypt(credentials.token),
-                        credentials.expiry if credentials.expiry else None,
-                        user_id,
-                        project_id
-                    )
-                )
+        # Update stored token (caller already has the fresh credentials)
+        run_in_background(
+            "token_refresh_update", _store_refreshed_token, user_id, project_id, credentials
+        )
         
         logger.info(f"Refreshed OAuth token for project {project_id}")
     
@@ -15,7 +15,7 @@ from src.services.gcs_storage import get_gcs_storage
 from src.utils.clerk_auth import get_current_user_id
 from src.core.config import settings
 from src.api.deployment_logs import register_deployment, get_log_callback, send_log, send_completion
-from src.api.env_vars import get_decrypted_env_vars
+from src.api.env_vars import render_env_vars_tfvars
 from src.utils.gcp_credentials_validator import check_gcp_credentials
 import asyncio
 
@@ -224,8 +224,8 @@ async def plan_gcp_deployment(
             raise HTTPException(status_code=400, detail="Could not find image URI. Please rebuild the image.")
         
         # Get environment variables from database (decrypted)
-        env_vars = await get_decrypted_env_vars(project_id)
-        logger.info(f"Retrieved {len(env_vars)} environment variables for deployment")
+        env_vars_tfvars, env_var_count = await render_env_vars_tfvars(project_id)
+        logger.info(f"Retrieved {env_var_count} environment variables for deployment")
         
         # Register for SSE streaming
         register_deployment(project_id)
@@ -298,14 +298,7 @@ async def plan_gcp_deployment(
             service_name = project['name'].lower().replace('_', '-')
             
             # Format env vars as Terraform map
-            env_vars_tf = ""
-            if env_vars:
-                env_items = [f'  {k} = "{v}"' for k, v in env_vars.items()]
-                env_vars_tf = f"""app_env_vars = {{
-{chr(10).join(env_items)}
-}}"""
-            else:
-                env_vars_tf = "app_env_vars = null"
+            env_vars_tf = env_vars_tfvars or "app_env_vars = null"
             
             tfvars_content = f"""# Generated by Sirpi
 project_id = "{gcp_project_id}"
@@ -316,7 +309,7 @@ image_uri  = "{image_uri}"
 """
             
             await sandbox.write_file(f"{tf_dir}/terraform.tfvars", tfvars_content)
-            sandbox._log(f"Created terraform.tfvars with {len(env_vars)} environment variables")
+            sandbox._log(f"Created terraform.tfvars with {env_var_count} environment variables")
             
             # Get Terraform credentials env var
             terraform_env = {}
@@ -358,7 +351,7 @@ image_uri  = "{image_uri}"
             "data": {
                 "operation_id": f"plan_{project_id}",
                 "plan_output": collected_logs[-50:],  # Last 50 lines for response
-                "env_var_count": len(env_vars),
+                "env_var_count": env_var_count,
                 "message": "Terraform plan generated successfully"
             }
         }
@@ -435,8 +428,8 @@ async def apply_gcp_deployment(
             raise HTTPException(status_code=400, detail="Could not find image URI. Please rebuild the image.")
         
         # Get environment variables
-        env_vars = await get_decrypted_env_vars(project_id)
-        logger.info(f"Retrieved {len(env_vars)} environment variables for deployment")
+        env_vars_tfvars, env_var_count = await render_env_vars_tfvars(project_id)
+        logger.info(f"Retrieved {env_var_count} environment variables for deployment")
         
         # Register for SSE streaming
         register_deployment(project_id)
@@ -501,14 +494,7 @@ async def apply_gcp_deployment(
             
             # Create tfvars
             service_name = project['name'].lower().replace('_', '-')
-            env_vars_tf = ""
-            if env_vars:
-                env_items = [f'  {k} = "{v}"' for k, v in env_vars.items()]
-                env_vars_tf = f"""app_env_vars = {{
-{chr(10).join(env_items)}
-}}"""
-            else:
-                env_vars_tf = "app_env_vars = null"
+            env_vars_tf = env_vars_tfvars or "app_env_vars = null"
             
             tfvars_content = f"""project_id = "{gcp_project_id}"
 region     = "{settings.gcp_cloud_run_region}"
@@ -650,7 +636,7 @@ async def destroy_gcp_deployment(
         gcp_project_id = gcp_creds["project_id"]
         
         # Get env vars (needed for tfvars to match plan/apply)
-        env_vars = await get_decrypted_env_vars(project_id)
+        env_vars_tfvars, env_var_count = await render_env_vars_tfvars(project_id)
 
         # Get image URI from build logs (optional for destroy, but needed for tfvars consistency)
         build_logs = supabase.get_deployment_logs(project_id, "build_image")
@@ -733,14 +719,7 @@ async def destroy_gcp_deployment(
             
             # Create tfvars (same as plan/apply for consistency)
             service_name = project['name'].lower().replace('_', '-')
-            env_vars_tf = ""
-            if env_vars:
-                env_items = [f'  {k} = "{v}"' for k, v in env_vars.items()]
-                env_vars_tf = f"""app_env_vars = {{
-{chr(10).join(env_items)}
-}}"""
-            else:
-                env_vars_tf = "app_env_vars = null"
+            env_vars_tf = env_vars_tfvars or "app_env_vars = null"
             
             tfvars_content = f"""project_id = "{gcp_project_id}"
 region     = "{settings.gcp_cloud_run_region}"
@@ -1,14 +1,116 @@
-from fastapi import APIRouter
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+import orjson
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import ORJSONResponse
 from src.models import HealthResponse
-from src.core.config import settings
+from src.core.config import Settings, get_settings, settings
 from src.services.supabase import supabase
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Load-balancer probes hit these endpoints every few seconds on every replica;
+# collapse bursts into one DB check per TTL window.
+_HEALTH_TTL = 5.0
+_cache: Dict[str, Dict[str, Any]] = {}
+_locks: Dict[str, asyncio.Lock] = {}
+_last_healthy: Dict[str, Dict[str, Any]] = {}
+
+
+async def _cached_check(key: str, check: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Run a health check at most once per TTL window (single-flight).
+    A check that raises, times out or reports anything but healthy falls back
+    to the last healthy result, marked stale.
+    """
+    entry = _cache.get(key)
+    if entry and time.monotonic() - entry["ts"] < _HEALTH_TTL:
+        return entry["val"]
+
+    lock = _locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        # Another request may have refreshed the entry while we waited
+        entry = _cache.get(key)
+        if entry and time.monotonic() - entry["ts"] < _HEALTH_TTL:
+            return entry["val"]
+
+        val = await _run_check(check())
+        if val.get("status") == "healthy":
+            _last_healthy[key] = val
+        elif key in _last_healthy:
+            val = {**_last_healthy[key], "status": "stale"}
+
+        _cache[key] = {"ts": time.monotonic(), "val": val}
+        return val
+
+
+_CHECK_TIMEOUT = 2.0
+
+
+def _gemini_status() -> Dict[str, Any]:
+    backend = "vertexai" if settings.google_genai_use_vertexai else "ai_studio"
+    if backend == "ai_studio" and not settings.google_api_key:
+        return {"status": "error", "detail": "GOOGLE_API_KEY not set"}
+    return {"status": "configured", "backend": backend, "model": settings.gemini_model}
+
+
+def _e2b_status() -> Dict[str, Any]:
+    if not settings.e2b_api_key:
+        return {"status": "error", "detail": "E2B_API_KEY not set"}
+    return {"status": "configured", "template": settings.e2b_template_id or "default"}
+
+
+async def _check_github() -> Dict[str, Any]:
+    if not os.path.exists(settings.github_app_private_key_path):
+        return {"status": "error", "detail": "GitHub App private key not found"}
+    return {"status": "configured", "app_name": settings.github_app_name}
+
+
+async def _run_check(check: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Bound a dependency check so one slow service can't stall the endpoint."""
+    try:
+        return await asyncio.wait_for(check, timeout=_CHECK_TIMEOUT)
+    except asyncio.TimeoutError:
+        return {"status": "error", "detail": f"Timed out after {_CHECK_TIMEOUT}s"}
+    except Exception as e:
+        return {"status": "error", "detail": str(e)}
+
+
+# Liveness only reports that the process is serving requests - no I/O.
+# Serialized once at import so each probe just writes the cached bytes.
+_LIVENESS_RESPONSE = HealthResponse(
+    status="healthy", version="1.0.0", environment=settings.environment
+)
+_LIVENESS_BYTES = orjson.dumps(_LIVENESS_RESPONSE.model_dump())
+
+# Derived entirely from settings, which don't change after startup
+_STATIC_CONFIG = {
+    "database_port": settings.supabase_port,
+    "default_cloud_provider": settings.default_cloud_provider,
+    "gcp_project": settings.google_cloud_project,
+    "gcp_region": settings.gcp_cloud_run_region,
+    "aws_region": settings.aws_region,
+    "gemini_model": settings.gemini_model,
+    "adk_session_service": settings.adk_session_service_type,
+}
+
+# Gemini and E2B checks only inspect configuration, so their results are static too
+_GEMINI_STATUS = _gemini_status()
+_E2B_STATUS = _e2b_status()
+
+
+@router.get("/health/live", response_model=HealthResponse)
+async def liveness_check():
+    return Response(content=_LIVENESS_BYTES, media_type="application/json")
 
 
 @router.get("/health", response_model=HealthResponse)
-async def health_check():
-    db_health = await supabase.health_check()
+@router.get("/health/ready", response_model=HealthResponse)
+async def health_check(settings: Settings = Depends(get_settings)):
+    db_health = await _cached_check("health", supabase.health_check)
     db_status = db_health.get("status", "unknown")
     overall_status = "healthy" if db_status == "healthy" else "degraded"
 
@@ -26,8 +128,12 @@ async def health_check():
 
 
 @router.get("/health/detailed")
-async def detailed_health_check():
-    db_health = await supabase.health_check()
+async def detailed_health_check(settings: Settings = Depends(get_settings)):
+    # Checks run concurrently: latency is the slowest check, not the sum
+    db_health, github = await asyncio.gather(
+        _cached_check("detailed", supabase.health_check),
+        _run_check(_check_github()),
+    )
 
     return {
         "status": "healthy" if db_health.get("status") == "healthy" else "degraded",
@@ -35,13 +141,12 @@ async def detailed_health_check():
         "environment": settings.environment,
         "services": {
             "supabase": db_health,
+            "gemini": _GEMINI_STATUS,
+            "e2b": _E2B_STATUS,
+            "github": github,
             "bedrock": {"status": "not_implemented"},
             "dynamodb": {"status": "not_implemented"},
             "s3": {"status": "not_implemented"},
         },
-        "configuration": {
-            "database_port": settings.supabase_port,
-            "aws_region": settings.aws_region,
-            "bedrock_model": settings.bedrock_model_id,
-        },
+        "configuration": _STATIC_CONFIG,
     }
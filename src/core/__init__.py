@@ -1,5 +1,5 @@
 """Core module initialization."""
 
-from .config import settings
+from .config import Settings, get_settings, settings
 
-__all__ = ["settings"]
+__all__ = ["Settings", "get_settings", "settings"]
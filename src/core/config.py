@@ -3,15 +3,20 @@ Core configuration for Sirpi Google Cloud Run application.
 Cloud-agnostic platform - users can deploy to GCP or AWS.
 """
 
+from functools import lru_cache
+from urllib.parse import quote_plus
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List, Literal
+from typing import Any, Literal, Tuple
 
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
 
     model_config = SettingsConfigDict(
-        env_file=".env", env_file_encoding="utf-8", case_sensitive=False, extra="ignore"
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        extra="ignore",
     )
 
     # Application Settings
@@ -86,6 +91,7 @@ class Settings(BaseSettings):
     # Google Cloud Storage
     gcs_bucket_name: str = "sirpi-generated-files"
     gcs_bucket_region: str = "us-central1"
+    gcs_signing_key_path: str | None = None  # Service account key for signed download URLs
 
     # E2B API Key for sandbox execution (unchanged)
     e2b_api_key: str
@@ -99,28 +105,32 @@ class Settings(BaseSettings):
     # Encryption for sensitive data
     encryption_master_key: str | None = None
 
-    @property
-    def cors_origins_list(self) -> List[str]:
-        """Parse CORS origins from comma-separated string."""
-        return [origin.strip() for origin in self.cors_origins.split(",")]
+    # Derived values, computed once in model_post_init
+    _cors_origins_list: Tuple[str, ...]
+    _database_url: str
+    _adk_session_db_url: str
 
-    @property
-    def database_url(self) -> str:
+    def model_post_init(self, __context: Any) -> None:
+        """Precompute derived settings once - they never change after load."""
+        self._cors_origins_list = tuple(
+            origin.strip() for origin in self.cors_origins.split(",")
+        )
+        self._database_url = self._build_database_url()
+        self._adk_session_db_url = self._build_adk_session_db_url()
+
+    def _build_database_url(self) -> str:
         """Build database connection string for SQLAlchemy (Supabase)."""
         return (
             f"postgresql+psycopg2://{self.supabase_user}:{self.supabase_password}"
             f"@{self.supabase_host}:{self.supabase_port}/{self.supabase_dbname}"
         )
 
-    @property
-    def adk_session_db_url(self) -> str:
+    def _build_adk_session_db_url(self) -> str:
         """
         Build ADK session database URL.
         Uses Supabase with pg8000 driver (required by ADK DatabaseSessionService).
         URL-encodes password to handle special characters like @.
         """
-        from urllib.parse import quote_plus
-
         encoded_password = quote_plus(self.supabase_password)
 
         return (
@@ -128,5 +138,26 @@ class Settings(BaseSettings):
             f"@{self.supabase_host}:{self.supabase_port}/{self.supabase_dbname}"
         )
 
+    @property
+    def cors_origins_list(self) -> Tuple[str, ...]:
+        """CORS origins parsed from the comma-separated string."""
+        return self._cors_origins_list
+
+    @property
+    def database_url(self) -> str:
+        """Database connection string for SQLAlchemy (Supabase)."""
+        return self._database_url
+
+    @property
+    def adk_session_db_url(self) -> str:
+        """ADK session database URL (pg8000 driver, URL-encoded password)."""
+        return self._adk_session_db_url
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once per process (use as a FastAPI dependency)."""
+    return Settings()
+
 
-settings = Settings()
+settings = get_settings()
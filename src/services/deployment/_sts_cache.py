@@ -0,0 +1,232 @@
+"""
+Process-wide cache for assumed-role sessions and the boto3 clients built on them.
+Deployment services are created per request, so caching per instance meant every
+Terraform run and Docker build paid a fresh AssumeRole round-trip.
+
+Each user role gets one botocore session whose credentials assume the role lazily
+and re-assume it shortly before expiry. Assumed credentials are also persisted by
+botocore's JSONFileCache under ~/.sirpi/cache/botocore (like the awscli assume-role
+cache), so other worker processes and restarts within the token lifetime reuse them.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import boto3
+import botocore.session
+from botocore.credentials import (
+    AssumeRoleCredentialFetcher,
+    CredentialProvider,
+    CredentialResolver,
+    DeferredRefreshableCredentials,
+    JSONFileCache,
+)
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_CACHE_DIR = Path.home() / ".sirpi" / "cache" / "botocore"
+
+# Sirpi's own identity (default credential chain) - the source for every AssumeRole.
+# It also owns the loaded service models, which role sessions share so clients after
+# the first skip the slow botocore model loading. Sessions aren't thread-safe, hence
+# the lock around session and client creation (the clients themselves are).
+_BASE_SESSION = botocore.session.Session()
+_CLIENT_LOCK = threading.Lock()
+
+# STS client on Sirpi's own identity, for AssumeRole calls that must bypass the caches
+_STS_CLIENT: Any = None
+
+# sha1(role_arn|external_id) -> session whose credentials refresh themselves
+_ROLE_SESSIONS: Dict[str, boto3.Session] = {}
+# (service_name, region_name, sha1(role_arn|external_id)) -> client
+_ROLE_CLIENTS: Dict[Tuple[str, str, str], Any] = {}
+
+
+def _cache_key(role_arn: str, external_id: str) -> str:
+    return hashlib.sha1(f"{role_arn}|{external_id}".encode()).hexdigest()
+
+
+class _AssumeRoleProvider(CredentialProvider):
+    """Credential provider that resolves to the user's role, refreshed before expiry."""
+
+    METHOD = "assume-role"
+    CANONICAL_NAME = "sirpi-assume-role"
+
+    def __init__(self, fetcher: AssumeRoleCredentialFetcher):
+        self._fetcher = fetcher
+
+    def load(self):
+        # Same wiring botocore uses for assume-role profiles: credentials are fetched on
+        # first use and refreshed in the background of API calls shortly before expiry
+        return DeferredRefreshableCredentials(
+            method=self.METHOD, refresh_using=self._fetcher.fetch_credentials
+        )
+
+
+def _create_role_session(role_arn: str, external_id: str, session_name: str) -> boto3.Session:
+    """Build a session that assumes the role lazily and re-assumes it before expiry."""
+    botocore_session = botocore.session.Session()
+    botocore_session.set_config_variable("region", settings.aws_region)
+    botocore_session.register_component("data_loader", _BASE_SESSION.get_component("data_loader"))
+
+    fetcher = AssumeRoleCredentialFetcher(
+        client_creator=botocore_session.create_client,
+        source_credentials=_BASE_SESSION.get_credentials(),
+        role_arn=role_arn,
+        extra_args={
+            "ExternalId": external_id,
+            "RoleSessionName": session_name,
+            "DurationSeconds": 3600,
+        },
+        cache=JSONFileCache(str(_CACHE_DIR)),
+    )
+    botocore_session.register_component(
+        "credential_provider", CredentialResolver([_AssumeRoleProvider(fetcher)])
+    )
+    return boto3.Session(botocore_session=botocore_session)
+
+
+def _get_role_session(role_arn: str, external_id: str, session_name: str) -> boto3.Session:
+    """Get the shared session for a role (the first caller's session_name is used)."""
+    role_key = _cache_key(role_arn, external_id)
+
+    session = _ROLE_SESSIONS.get(role_key)
+    if session is not None:
+        return session
+
+    with _CLIENT_LOCK:
+        session = _ROLE_SESSIONS.get(role_key)
+        if session is None:
+            session = _create_role_session(role_arn, external_id, session_name)
+            _ROLE_SESSIONS[role_key] = session
+        return session
+
+
+def _assume_role_fresh(role_arn: str, external_id: str, session_name: str) -> dict:
+    """Call STS AssumeRole directly (blocking) - a full-lifetime token, no caches."""
+    global _STS_CLIENT
+
+    with _CLIENT_LOCK:
+        if _STS_CLIENT is None:
+            _STS_CLIENT = _BASE_SESSION.create_client("sts", region_name=settings.aws_region)
+
+    response = _STS_CLIENT.assume_role(
+        RoleArn=role_arn,
+        RoleSessionName=session_name,
+        ExternalId=external_id,
+        DurationSeconds=3600,
+    )
+    return response["Credentials"]
+
+
+def get_cached_credentials_sync(
+    role_arn: str,
+    external_id: str,
+    session_name: str = "sirpi-deployment",
+    min_ttl_seconds: int = 0,
+) -> dict:
+    """
+    Blocking variant of get_cached_credentials (for sync callers and worker threads).
+
+    Args:
+        role_arn: IAM role ARN in user's account
+        external_id: External ID for role assumption
+        session_name: RoleSessionName used when a new AssumeRole call is made
+        min_ttl_seconds: Minimum remaining lifetime the returned keys must have.
+            Frozen keys can't refresh themselves, and botocore only re-assumes the
+            role once less than ~15 minutes remain, so callers handing keys to
+            long-running processes should set this to their operation timeout.
+
+    Returns:
+        Credentials dict (AccessKeyId, SecretAccessKey, SessionToken)
+    """
+    session = _get_role_session(role_arn, external_id, session_name)
+    credentials = session.get_credentials()
+    # Refreshes (re-assumes the role) first if the current credentials are about to expire
+    frozen = credentials.get_frozen_credentials()
+
+    if min_ttl_seconds and credentials.refresh_needed(refresh_in=min_ttl_seconds):
+        # The shared (and disk-cached) credentials expire too soon - assume the role anew
+        logger.info(f"Cached role credentials expire within {min_ttl_seconds}s, re-assuming role")
+        fresh = _assume_role_fresh(role_arn, external_id, session_name)
+        return {
+            "AccessKeyId": fresh["AccessKeyId"],
+            "SecretAccessKey": fresh["SecretAccessKey"],
+            "SessionToken": fresh["SessionToken"],
+        }
+
+    return {
+        "AccessKeyId": frozen.access_key,
+        "SecretAccessKey": frozen.secret_key,
+        "SessionToken": frozen.token,
+    }
+
+
+async def get_cached_credentials(
+    role_arn: str,
+    external_id: str,
+    session_name: str = "sirpi-deployment",
+    min_ttl_seconds: int = 0,
+) -> dict:
+    """
+    Get temporary credentials for a user's role, assuming it only when needed.
+
+    Args:
+        role_arn: IAM role ARN in user's account
+        external_id: External ID for role assumption
+        session_name: RoleSessionName used when a new AssumeRole call is made
+        min_ttl_seconds: Minimum remaining lifetime the returned keys must have
+
+    Returns:
+        Credentials dict (AccessKeyId, SecretAccessKey, SessionToken)
+    """
+    # AssumeRole and the disk cache are blocking - keep them off the event loop
+    return await asyncio.to_thread(
+        get_cached_credentials_sync, role_arn, external_id, session_name, min_ttl_seconds
+    )
+
+
+def get_role_client(
+    service_name: str,
+    region_name: str,
+    role_arn: str,
+    external_id: str,
+    session_name: str = "sirpi-deployment",
+) -> Any:
+    """
+    Get a shared boto3 client for a user's role whose credentials never go stale.
+
+    The client refreshes its own credentials, so it is safe to hold across
+    long-running operations such as Terraform applies.
+
+    Args:
+        service_name: AWS service, e.g. "s3" or "dynamodb"
+        region_name: AWS region
+        role_arn: IAM role ARN in user's account
+        external_id: External ID for role assumption
+        session_name: RoleSessionName used when the role is assumed
+
+    Returns:
+        boto3 client (blocking on first use - call via asyncio.to_thread)
+    """
+    role_key = _cache_key(role_arn, external_id)
+    key = (service_name, region_name, role_key)
+
+    client = _ROLE_CLIENTS.get(key)
+    if client is not None:
+        return client
+
+    session = _get_role_session(role_arn, external_id, session_name)
+
+    with _CLIENT_LOCK:
+        client = _ROLE_CLIENTS.get(key)
+        if client is None:
+            client = session.client(service_name, region_name=region_name)
+            _ROLE_CLIENTS[key] = client
+        return client
@@ -3,18 +3,22 @@ AWS Deployment Service - Terraform operations for AWS ECS Fargate.
 Uses E2B sandbox and cross-account role assumption.
 """
 
-import boto3
+import asyncio
 import logging
-import json
 from typing import Dict, Optional
-from botocore.exceptions import ClientError
+
+import orjson
 
 from src.core.config import settings
 from src.services.deployment.sandbox_manager import SandboxManager
 from src.services.deployment.s3_state_manager import S3StateManager
+from src.services.deployment._sts_cache import get_cached_credentials
 
 logger = logging.getLogger(__name__)
 
+# init + plan + apply can take up to 25 minutes of sandbox time; keep 5 minutes spare
+_SANDBOX_CREDENTIALS_MIN_TTL_SECONDS = 30 * 60
+
 
 class AWSDeploymentService:
     """Service for AWS Terraform deployments."""
@@ -31,36 +35,26 @@ class AWSDeploymentService:
         self.sandbox = sandbox
         self.role_arn = role_arn
         self.external_id = external_id
+        self.log = sandbox.bind_logger(logger, "aws_deploy", role_arn=role_arn)
         self.state_manager = S3StateManager(role_arn, external_id)
-        self._credentials = None
-
-    def _get_credentials(self):
-        """Get temporary credentials by assuming user's role."""
-        if self._credentials:
-            return self._credentials
-
-        sts_client = boto3.client("sts", region_name=settings.aws_region)
-
-        try:
-            response = sts_client.assume_role(
-                RoleArn=self.role_arn,
-                RoleSessionName="sirpi-terraform",
-                ExternalId=self.external_id,
-                DurationSeconds=3600,
-            )
 
-            self._credentials = response["Credentials"]
-            logger.info(f"Successfully assumed role for Terraform: {self.role_arn}")
-            return self._credentials
-
-        except ClientError as e:
-            logger.error(f"Failed to assume role: {e}")
-            raise
+    async def _get_credentials(self):
+        """
+        Get temporary credentials by assuming user's role (cached per process).
+        The keys are written to the sandbox as static credentials, so they must
+        outlive the longest Terraform run that uses them.
+        """
+        return await get_cached_credentials(
+            self.role_arn,
+            self.external_id,
+            "sirpi-terraform",
+            min_ttl_seconds=_SANDBOX_CREDENTIALS_MIN_TTL_SECONDS,
+        )
 
     async def _configure_aws_credentials(self):
         """Configure AWS credentials in sandbox for Terraform."""
         try:
-            creds = self._get_credentials()
+            creds = await self._get_credentials()
 
             # Write AWS credentials file
             aws_config = f"""[default]
@@ -74,14 +68,22 @@ aws_secret_access_key = {creds["SecretAccessKey"]}
 aws_session_token = {creds["SessionToken"]}
 """
 
-            # Create .aws directory
-            await self.sandbox.run_command("mkdir -p /home/user/.aws", stream_output=False)
+            # Create .aws directory and write both files in a single sandbox round-trip.
+            # The credentials go in over stdin so the secrets never appear on a command line.
+            script = (
+                "{ mkdir -p /home/user/.aws"
+                f" && printf '%s' '{aws_config}' > /home/user/.aws/config"
+                " && umask 077 && cat > /home/user/.aws/credentials"
+                " && chmod 600 /home/user/.aws/credentials; }"
+            )
+            result = await self.sandbox.run_command(
+                script, stream_output=False, stdin=aws_credentials.encode()
+            )
 
-            # Write config files
-            await self.sandbox.write_file("/home/user/.aws/config", aws_config)
-            await self.sandbox.write_file("/home/user/.aws/credentials", aws_credentials)
+            if result["exit_code"] != 0:
+                raise RuntimeError(f"Failed to write AWS credentials: {result['stderr']}")
 
-            self.sandbox._log("✅ AWS credentials configured for Terraform")
+            self.log.info("✅ AWS credentials configured for Terraform")
 
         except Exception as e:
             logger.error(f"Failed to configure AWS credentials: {e}")
@@ -95,7 +97,7 @@ aws_session_token = {creds["SessionToken"]}
             tf_dir: Directory containing Terraform files
         """
         try:
-            self.sandbox._log("$ terraform init")
+            self.log.info("$ terraform init")
 
             result = await self.sandbox.run_command(
                 f"cd {tf_dir} && terraform init", stream_output=True, timeout=300
@@ -104,7 +106,7 @@ aws_session_token = {creds["SessionToken"]}
             if result["exit_code"] != 0:
                 raise RuntimeError(f"Terraform init failed: {result['stderr']}")
 
-            self.sandbox._log("✅ Terraform initialized successfully")
+            self.log.info("✅ Terraform initialized successfully")
 
         except Exception as e:
             logger.error(f"Terraform init failed: {e}")
@@ -128,14 +130,14 @@ aws_session_token = {creds["SessionToken"]}
             if var_file:
                 cmd += f" -var-file={var_file}"
 
-            self.sandbox._log(f"$ terraform plan")
+            self.log.info("$ terraform plan")
 
             result = await self.sandbox.run_command(cmd, stream_output=True, timeout=300)
 
             if result["exit_code"] != 0:
                 raise RuntimeError(f"Terraform plan failed: {result['stderr']}")
 
-            self.sandbox._log("✅ Terraform plan generated successfully")
+            self.log.info("✅ Terraform plan generated successfully")
             return result["stdout"]
 
         except Exception as e:
@@ -160,7 +162,7 @@ aws_session_token = {creds["SessionToken"]}
             if var_file:
                 cmd += f" -var-file={var_file}"
 
-            self.sandbox._log(f"$ terraform apply -auto-approve")
+            self.log.info("$ terraform apply -auto-approve")
 
             result = await self.sandbox.run_command(
                 cmd,
@@ -171,7 +173,7 @@ aws_session_token = {creds["SessionToken"]}
             if result["exit_code"] != 0:
                 raise RuntimeError(f"Terraform apply failed: {result['stderr']}")
 
-            self.sandbox._log("✅ Infrastructure deployed successfully")
+            self.log.info("✅ Infrastructure deployed successfully")
 
             # Get outputs
             outputs = await self._get_terraform_outputs(tf_dir)
@@ -181,6 +183,51 @@ aws_session_token = {creds["SessionToken"]}
             logger.error(f"Terraform apply failed: {e}")
             raise
 
+    async def terraform_deploy(
+        self, tf_dir: str = "/home/user/terraform", var_file: Optional[str] = None
+    ) -> Dict:
+        """
+        Run terraform init, plan and apply as one sandbox command.
+        Apply uses the saved plan, so it deploys exactly what was planned.
+
+        Args:
+            tf_dir: Directory containing Terraform files
+            var_file: Path to tfvars file
+
+        Returns:
+            Dict with outputs
+        """
+        try:
+            plan_cmd = "terraform plan -input=false -out=tfplan"
+            if var_file:
+                plan_cmd += f" -var-file={var_file}"
+
+            cmd = (
+                f"cd {tf_dir} && terraform init -input=false && {plan_cmd}"
+                " && terraform apply -input=false -auto-approve tfplan"
+            )
+
+            self.log.info("$ terraform init && terraform plan && terraform apply")
+
+            result = await self.sandbox.run_command(
+                cmd,
+                stream_output=True,
+                timeout=1200,  # 20 minutes for init + plan + apply
+            )
+
+            if result["exit_code"] != 0:
+                raise RuntimeError(f"Terraform deploy failed: {result['stderr']}")
+
+            self.log.info("✅ Infrastructure deployed successfully")
+
+            # Get outputs
+            outputs = await self._get_terraform_outputs(tf_dir)
+            return outputs
+
+        except Exception as e:
+            logger.error(f"Terraform deploy failed: {e}")
+            raise
+
     async def terraform_destroy(
         self, tf_dir: str = "/home/user/terraform", var_file: Optional[str] = None
     ):
@@ -196,7 +243,7 @@ aws_session_token = {creds["SessionToken"]}
             if var_file:
                 cmd += f" -var-file={var_file}"
 
-            self.sandbox._log(f"$ terraform destroy -auto-approve")
+            self.log.info("$ terraform destroy -auto-approve")
 
             result = await self.sandbox.run_command(
                 cmd,
@@ -207,7 +254,7 @@ aws_session_token = {creds["SessionToken"]}
             if result["exit_code"] != 0:
                 raise RuntimeError(f"Terraform destroy failed: {result['stderr']}")
 
-            self.sandbox._log("✅ Infrastructure destroyed successfully")
+            self.log.info("✅ Infrastructure destroyed successfully")
 
         except Exception as e:
             logger.error(f"Terraform destroy failed: {e}")
@@ -232,17 +279,13 @@ aws_session_token = {creds["SessionToken"]}
                 logger.warning(f"Failed to get outputs: {result['stderr']}")
                 return {}
 
-            outputs = json.loads(result["stdout"])
+            outputs = orjson.loads(result["stdout"])
 
             # Extract just the values
-            simplified_outputs = {}
-            for key, value in outputs.items():
-                if isinstance(value, dict) and "value" in value:
-                    simplified_outputs[key] = value["value"]
-                else:
-                    simplified_outputs[key] = value
-
-            return simplified_outputs
+            return {
+                key: value["value"] if isinstance(value, dict) and "value" in value else value
+                for key, value in outputs.items()
+            }
 
         except Exception as e:
             logger.warning(f"Could not parse Terraform outputs: {e}")
@@ -257,14 +300,16 @@ aws_session_token = {creds["SessionToken"]}
             tf_dir: Directory containing Terraform files
         """
         try:
-            self.sandbox._log("Configuring Terraform state backend...")
+            self.log.info("Configuring Terraform state backend...")
 
             # Generate backend configuration
-            backend_config = self.state_manager.configure_backend(project_name)
+            backend_config = await asyncio.to_thread(
+                self.state_manager.configure_backend, project_name
+            )
 
             # Write backend.tf
             await self.sandbox.write_file(f"{tf_dir}/backend.tf", backend_config)
-            self.sandbox._log("✅ Configured S3 backend for Terraform state")
+            self.log.info("✅ Configured S3 backend for Terraform state")
 
         except Exception as e:
             logger.error(f"Failed to setup Terraform state: {e}")
@@ -3,17 +3,24 @@ AWS Docker Build Service - Builds and pushes Docker images to ECR.
 Uses E2B sandbox and cross-account role assumption.
 """
 
-import boto3
+import asyncio
 import base64
 import logging
-from typing import Dict, Optional
+import time
+from typing import Dict, Optional, Tuple
 from botocore.exceptions import ClientError
 
 from src.core.config import settings
 from src.services.deployment.sandbox_manager import SandboxManager
+from src.services.deployment._sts_cache import get_role_client
 
 logger = logging.getLogger(__name__)
 
+# (role_arn, repository_name) -> (repository_uri, cached_at). Repositories are never
+# deleted by Sirpi, so repeat builds can skip the describe_repositories round-trip.
+_ECR_REPO_URI_TTL_SECONDS = 3600
+_ECR_REPO_URI_CACHE: Dict[Tuple[str, str], Tuple[str, float]] = {}
+
 
 class AWSDockerBuildService:
     """Service for building Docker images and pushing to AWS ECR."""
@@ -30,40 +37,18 @@ class AWSDockerBuildService:
         self.sandbox = sandbox
         self.role_arn = role_arn
         self.external_id = external_id
-        self._credentials = None
-
-    def _get_credentials(self):
-        """Get temporary credentials by assuming user's role."""
-        if self._credentials:
-            return self._credentials
-
-        sts_client = boto3.client("sts", region_name=settings.aws_region)
-
-        try:
-            response = sts_client.assume_role(
-                RoleArn=self.role_arn,
-                RoleSessionName="sirpi-docker-build",
-                ExternalId=self.external_id,
-                DurationSeconds=3600,
-            )
-
-            self._credentials = response["Credentials"]
-            logger.info(f"Successfully assumed role for Docker build: {self.role_arn}")
-            return self._credentials
-
-        except ClientError as e:
-            logger.error(f"Failed to assume role: {e}")
-            raise
+        self.log = sandbox.bind_logger(logger, "aws_docker_build", role_arn=role_arn)
 
-    def _get_ecr_client(self):
-        """Get ECR client with assumed role credentials."""
-        creds = self._get_credentials()
-        return boto3.client(
+    async def _get_ecr_client(self):
+        """Get the shared ECR client for the user's role (credentials refresh automatically)."""
+        # First construction assumes the role and loads service models - do it off the event loop
+        return await asyncio.to_thread(
+            get_role_client,
             "ecr",
-            aws_access_key_id=creds["AccessKeyId"],
-            aws_secret_access_key=creds["SecretAccessKey"],
-            aws_session_token=creds["SessionToken"],
-            region_name=settings.aws_ecr_region,
+            settings.aws_ecr_region,
+            self.role_arn,
+            self.external_id,
+            "sirpi-docker-build",
         )
 
     async def _ensure_ecr_repository(self, repository_name: str) -> str:
@@ -76,26 +61,36 @@ class AWSDockerBuildService:
         Returns:
             ECR repository URI
         """
-        ecr_client = self._get_ecr_client()
+        cache_key = (self.role_arn, repository_name)
+        cached = _ECR_REPO_URI_CACHE.get(cache_key)
+        if cached and time.monotonic() - cached[1] < _ECR_REPO_URI_TTL_SECONDS:
+            return cached[0]
+
+        ecr_client = await self._get_ecr_client()
 
         try:
             # Check if repository exists
-            response = ecr_client.describe_repositories(repositoryNames=[repository_name])
+            response = await asyncio.to_thread(
+                ecr_client.describe_repositories, repositoryNames=[repository_name]
+            )
             repository_uri = response["repositories"][0]["repositoryUri"]
-            self.sandbox._log(f"✅ ECR repository exists: {repository_uri}")
+            _ECR_REPO_URI_CACHE[cache_key] = (repository_uri, time.monotonic())
+            self.log.info("✅ ECR repository exists: %s", repository_uri)
             return repository_uri
 
         except ClientError as e:
             if e.response["Error"]["Code"] == "RepositoryNotFoundException":
                 # Create repository
-                self.sandbox._log(f"Creating ECR repository: {repository_name}...")
-                response = ecr_client.create_repository(
+                self.log.info("Creating ECR repository: %s...", repository_name)
+                response = await asyncio.to_thread(
+                    ecr_client.create_repository,
                     repositoryName=repository_name,
                     imageScanningConfiguration={"scanOnPush": True},
                     encryptionConfiguration={"encryptionType": "AES256"},
                 )
                 repository_uri = response["repository"]["repositoryUri"]
-                self.sandbox._log(f"✅ Created ECR repository: {repository_uri}")
+                _ECR_REPO_URI_CACHE[cache_key] = (repository_uri, time.monotonic())
+                self.log.info("✅ Created ECR repository: %s", repository_uri)
                 return repository_uri
             else:
                 raise
@@ -107,10 +102,10 @@ class AWSDockerBuildService:
         Returns:
             Dict with username and password for Docker login
         """
-        ecr_client = self._get_ecr_client()
+        ecr_client = await self._get_ecr_client()
 
         try:
-            response = ecr_client.get_authorization_token()
+            response = await asyncio.to_thread(ecr_client.get_authorization_token)
             auth_data = response["authorizationData"][0]
 
             # Decode base64 token
@@ -142,51 +137,67 @@ class AWSDockerBuildService:
             Full ECR image URI with tag
         """
         try:
-            # Ensure ECR repository exists
             repository_name = f"sirpi/{image_name.lower()}"
-            ecr_uri = await self._ensure_ecr_repository(repository_name)
-            full_image_uri = f"{ecr_uri}:latest"
 
             # Clone repository
-            self.sandbox._log(f"Cloning {repository_url}...")
+            self.log.info("Cloning %s...", repository_url)
             owner_repo = repository_url.replace("https://github.com/", "").rstrip("/")
 
-            await self.sandbox.run_command(
-                f"git clone {repository_url} /home/user/repo", stream_output=True
+            # ECR setup (AWS API) and the clone (sandbox network) are independent - run
+            # them concurrently. Shallow clone: the build only needs the tree at HEAD.
+            ecr_uri, _, ecr_login = await asyncio.gather(
+                self._ensure_ecr_repository(repository_name),
+                self.sandbox.run_command(
+                    f"git clone --depth=1 --single-branch {repository_url} /home/user/repo",
+                    stream_output=True,
+                ),
+                self._get_ecr_login_password(),
             )
-            self.sandbox._log("✅ Repository cloned")
+            full_image_uri = f"{ecr_uri}:latest"
+            self.log.info("✅ Repository cloned")
 
             # Write Dockerfile
             await self.sandbox.write_file("/home/user/repo/Dockerfile", dockerfile_content)
-            self.sandbox._log("Wrote Dockerfile")
+            self.log.info("Wrote Dockerfile")
 
-            # Build Docker image
-            self.sandbox._log(f"Building Docker image: {image_name}:latest...")
-            image_tag = f"{image_name.lower()}:latest"
-
-            await self.sandbox.build_docker_image(
-                dockerfile_path="/home/user/repo/Dockerfile",
-                image_name=image_tag,
-                context_dir="/home/user/repo",
-            )
-
-            # Get ECR login credentials
-            self.sandbox._log("Authenticating with ECR...")
-            ecr_login = await self._get_ecr_login_password()
+            # Authenticate before building so BuildKit can pull the layer cache from ECR
+            await self.sandbox.ensure_docker_daemon()
+            self.log.info("Authenticating with ECR...")
 
             # Login to ECR
             login_result = await self.sandbox.run_command(
-                f"echo {ecr_login['password']} | docker login --username {ecr_login['username']} --password-stdin {ecr_login['registry']}",
+                f"docker login --username {ecr_login['username']} --password-stdin {ecr_login['registry']}",
                 stream_output=False,
+                stdin=ecr_login["password"].encode(),
             )
 
             if login_result["exit_code"] != 0:
                 raise RuntimeError(f"ECR login failed: {login_result['stderr']}")
 
-            self.sandbox._log("✅ ECR authentication successful")
+            self.log.info("✅ ECR authentication successful")
+
+            # Pull the previous build (if any) so its layers are local to the daemon -
+            # the build reuses them and the push skips every layer ECR already has
+            cache_image_uri = f"{ecr_uri}:cache"
+            await self.sandbox.run_command(
+                f"docker pull {cache_image_uri} 2>/dev/null || true",
+                stream_output=False,
+                timeout=300,
+            )
+
+            # Build Docker image, reusing unchanged layers from the previous push
+            self.log.info("Building Docker image: %s:latest...", image_name)
+            image_tag = f"{image_name.lower()}:latest"
+
+            await self.sandbox.build_docker_image(
+                dockerfile_path="/home/user/repo/Dockerfile",
+                image_name=image_tag,
+                context_dir="/home/user/repo",
+                cache_from=cache_image_uri,
+            )
 
             # Tag image for ECR
-            self.sandbox._log(f"Tagging image: {full_image_uri}")
+            self.log.info("Tagging image: %s", full_image_uri)
             tag_result = await self.sandbox.run_command(
                 f"docker tag {image_tag} {full_image_uri}", stream_output=False
             )
@@ -195,7 +206,7 @@ class AWSDockerBuildService:
                 raise RuntimeError(f"Docker tag failed: {tag_result['stderr']}")
 
             # Push to ECR
-            self.sandbox._log(f"Pushing to ECR: {full_image_uri}")
+            self.log.info("Pushing to ECR: %s", full_image_uri)
             push_result = await self.sandbox.run_command(
                 f"docker push {full_image_uri}",
                 stream_output=True,
@@ -205,11 +216,17 @@ class AWSDockerBuildService:
             if push_result["exit_code"] != 0:
                 raise RuntimeError(f"Docker push failed: {push_result['stderr']}")
 
-            self.sandbox._log(f"✅ Image pushed successfully: {full_image_uri}")
+            self.log.info("✅ Image pushed successfully: %s", full_image_uri)
+
+            # Push the cache tag too (layers are shared with :latest, so this is cheap)
+            cache_push = await self.sandbox.run_command(
+                f"docker push {cache_image_uri}", stream_output=False, timeout=600
+            )
+            if cache_push["exit_code"] != 0:
+                logger.warning(f"Failed to push build cache image: {cache_push['stderr']}")
 
             return full_image_uri
 
         except Exception as e:
-            logger.error(f"Docker build/push failed: {e}")
-            self.sandbox._log(f"❌ Build failed: {str(e)}")
+            self.log.error("❌ Build failed: %s", e, exc_info=True)
             raise
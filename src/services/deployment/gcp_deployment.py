@@ -11,6 +11,7 @@ from google.oauth2.credentials import Credentials
 
 from src.services.deployment.sandbox_manager import SandboxManager
 from src.api.gcp_auth import get_gcp_credentials
+from src.utils.gcp_credentials_validator import auth_request
 from src.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -167,11 +168,9 @@ class GCPDeploymentService:
             # Get OAuth credentials (auto-refreshed if expired)
             credentials = get_gcp_credentials(user_id, project_id)
 
-            from google.auth.transport.requests import Request
-
             # Ensure we have a valid access token
             if not credentials.token or credentials.expired:
-                credentials.refresh(Request())
+                credentials.refresh(auth_request)
 
             # Create ADC file for Terraform + Python SDKs
             adc_file = "/home/user/gcp-adc.json"
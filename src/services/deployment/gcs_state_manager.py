@@ -4,15 +4,96 @@ Production-ready - uses Application Default Credentials (ADC).
 No gcloud CLI required!
 """
 
+import asyncio
+import hashlib
 import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
 from google.cloud import storage
 from google.cloud import service_usage_v1
 from google.oauth2.credentials import Credentials
 from google.api_core import exceptions
 from src.core.config import settings
+from src.services.gcs_storage import configure_http_pool, delete_blobs, list_blobs_by_prefix
 
 logger = logging.getLogger(__name__)
 
+# bucket_name -> time it was last verified/created. State buckets are never deleted
+# by Sirpi, so repeat deployments can skip the GCS round-trips entirely.
+_VERIFIED_BUCKET_TTL_SECONDS = 3600
+_VERIFIED_BUCKETS: Dict[str, float] = {}
+
+
+def _is_verified(bucket_name: str) -> bool:
+    verified_at = _VERIFIED_BUCKETS.get(bucket_name)
+    return verified_at is not None and time.monotonic() - verified_at < _VERIFIED_BUCKET_TTL_SECONDS
+
+
+def _mark_verified(bucket_name: str) -> str:
+    _VERIFIED_BUCKETS[bucket_name] = time.monotonic()
+    return bucket_name
+
+
+# (project_id, sha256 of the user's refresh token) -> client. Building a client
+# resolves credentials and opens a new HTTPS pool, so reuse one per user/project.
+_MAX_STORAGE_CLIENTS = 32
+_STORAGE_CLIENTS: Dict[Tuple[str, str], storage.Client] = {}
+_STORAGE_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_storage_client(credentials: Credentials, project_id: str) -> storage.Client:
+    """Get a shared Storage client for these OAuth credentials and project."""
+    # The refresh token is stable for a user's grant, unlike the access token
+    secret = credentials.refresh_token or credentials.token or ""
+    key = (project_id, hashlib.sha256(secret.encode()).hexdigest())
+
+    with _STORAGE_CLIENTS_LOCK:
+        client = _STORAGE_CLIENTS.get(key)
+        if client is None:
+            if len(_STORAGE_CLIENTS) >= _MAX_STORAGE_CLIENTS:
+                # Evict the oldest entry (dicts keep insertion order)
+                del _STORAGE_CLIENTS[next(iter(_STORAGE_CLIENTS))]
+            client = configure_http_pool(
+                storage.Client(credentials=credentials, project=project_id)
+            )
+            _STORAGE_CLIENTS[key] = client
+        return client
+
+
+async def _retry_while_forbidden(func: Callable[..., Any], *args: Any, attempts: int = 6, **kwargs: Any) -> Any:
+    """
+    Run a blocking Storage call, retrying Forbidden with exponential backoff and jitter.
+    Used right after enabling the Storage API, while the enablement propagates.
+
+    Raises:
+        The last Forbidden error if the API still isn't usable after all attempts
+    """
+    for attempt in range(attempts):
+        try:
+            return await asyncio.to_thread(func, *args, **kwargs)
+        except exceptions.Forbidden:
+            if attempt == attempts - 1:
+                raise
+            delay = min(8.0, 0.5 * 2**attempt)
+            await asyncio.sleep(delay + random.uniform(0, 0.3))
+
+
+def _new_state_bucket(storage_client: storage.Client, bucket_name: str) -> storage.Bucket:
+    """Build the (not yet created) Terraform state bucket with its security settings."""
+    bucket = storage.Bucket(storage_client, bucket_name)
+    bucket.location = settings.gcp_cloud_run_region
+    bucket.storage_class = "STANDARD"
+
+    # Security settings
+    bucket.iam_configuration.uniform_bucket_level_access_enabled = True
+    bucket.iam_configuration.public_access_prevention = "enforced"
+
+    # Enable versioning (safety for state files)
+    bucket.versioning_enabled = True
+    return bucket
+
 
 async def ensure_gcs_state_bucket(
     credentials: Credentials, gcp_project_id: str, app_name: str, sandbox
@@ -34,19 +115,22 @@ async def ensure_gcs_state_bucket(
         RuntimeError if bucket cannot be created/verified
     """
     bucket_name = f"sirpi-terraform-states-{gcp_project_id}"
-    location = settings.gcp_cloud_run_region
+
+    if _is_verified(bucket_name):
+        sandbox._log(f"✅ State bucket already exists: {bucket_name}")
+        return bucket_name
 
     sandbox._log(f"Ensuring Terraform state bucket exists...")
 
     try:
         # Create Storage client with OAuth credentials
-        storage_client = storage.Client(credentials=credentials, project=gcp_project_id)
+        storage_client = _get_storage_client(credentials, gcp_project_id)
 
         # Check if bucket exists
         try:
-            bucket = storage_client.get_bucket(bucket_name)
+            await asyncio.to_thread(storage_client.get_bucket, bucket_name)
             sandbox._log(f"✅ State bucket already exists: {bucket_name}")
-            return bucket_name
+            return _mark_verified(bucket_name)
 
         except exceptions.NotFound:
             # Bucket doesn't exist - need to create it
@@ -61,17 +145,16 @@ async def ensure_gcs_state_bucket(
                 sandbox._log("Storage API not enabled, enabling now...")
                 await enable_storage_api(credentials, gcp_project_id, sandbox)
 
-                # Retry bucket check after enabling API
-                import asyncio
-
-                await asyncio.sleep(3)
-
-                try:
-                    bucket = storage_client.get_bucket(bucket_name)
-                    sandbox._log(f"✅ State bucket already exists: {bucket_name}")
-                    return bucket_name
-                except exceptions.NotFound:
-                    pass  # Continue to create bucket
+                # A freshly enabled project has no state bucket, so create it straight
+                # away (a 409 Conflict is handled below), retrying while enablement propagates
+                sandbox._log(f"Creating Terraform state bucket: gs://{bucket_name}...")
+                await _retry_while_forbidden(
+                    storage_client.create_bucket,
+                    _new_state_bucket(storage_client, bucket_name),
+                    project=gcp_project_id,
+                )
+                sandbox._log(f"✅ Created state bucket with versioning: {bucket_name}")
+                return _mark_verified(bucket_name)
             else:
                 # Real permission issue
                 raise RuntimeError(f"Permission denied accessing bucket: {error_str[:200]}")
@@ -79,22 +162,15 @@ async def ensure_gcs_state_bucket(
         # Create bucket
         sandbox._log(f"Creating Terraform state bucket: gs://{bucket_name}...")
 
-        bucket = storage.Bucket(storage_client, bucket_name)
-        bucket.location = location
-        bucket.storage_class = "STANDARD"
-
-        # Security settings
-        bucket.iam_configuration.uniform_bucket_level_access_enabled = True
-        bucket.iam_configuration.public_access_prevention = "enforced"
-
-        # Enable versioning (safety for state files)
-        bucket.versioning_enabled = True
-
-        new_bucket = storage_client.create_bucket(bucket, project=gcp_project_id)
+        await asyncio.to_thread(
+            storage_client.create_bucket,
+            _new_state_bucket(storage_client, bucket_name),
+            project=gcp_project_id,
+        )
 
         sandbox._log(f"✅ Created state bucket with versioning: {bucket_name}")
 
-        return bucket_name
+        return _mark_verified(bucket_name)
 
     except exceptions.Forbidden as e:
         error_msg = str(e)
@@ -106,10 +182,17 @@ async def ensure_gcs_state_bucket(
         else:
             raise RuntimeError(f"Permission denied: {error_msg[:200]}")
 
-    except exceptions.AlreadyExists:
-        # Race condition - bucket created between check and create (OK!)
+    except exceptions.Conflict:
+        # GCS answers 409 when the name is taken - either a concurrent deployment
+        # created it (OK!) or it belongs to someone else; only the former is readable
+        try:
+            await asyncio.to_thread(storage_client.get_bucket, bucket_name)
+        except (exceptions.Forbidden, exceptions.NotFound):
+            raise RuntimeError(
+                f"Bucket name {bucket_name} is already taken outside project {gcp_project_id}"
+            )
         sandbox._log(f"✅ State bucket already exists: {bucket_name}")
-        return bucket_name
+        return _mark_verified(bucket_name)
 
     except Exception as e:
         logger.error(f"Unexpected error with GCS bucket: {e}", exc_info=True)
@@ -162,19 +245,19 @@ async def cleanup_terraform_state(
         sandbox._log("Cleaning up Terraform state from GCS...")
 
         # Create Storage client
-        storage_client = storage.Client(credentials=credentials, project=gcp_project_id)
+        storage_client = _get_storage_client(credentials, gcp_project_id)
 
-        # Get bucket
-        try:
+        def _find_state_blobs():
             bucket = storage_client.get_bucket(bucket_name)
+            return list_blobs_by_prefix(bucket, state_prefix)
 
-            # Delete all blobs with prefix
-            blobs = bucket.list_blobs(prefix=state_prefix)
-            deleted_count = 0
+        # Get bucket
+        try:
+            # Bucket lookup and listing are blocking HTTP calls - keep them off the loop
+            blobs = await asyncio.to_thread(_find_state_blobs)
 
-            for blob in blobs:
-                blob.delete()
-                deleted_count += 1
+            # Delete all blobs with prefix, batched to cut HTTP round-trips
+            deleted_count = await asyncio.to_thread(delete_blobs, storage_client, blobs)
 
             if deleted_count > 0:
                 sandbox._log(f"✅ Deleted {deleted_count} state file(s) from GCS")
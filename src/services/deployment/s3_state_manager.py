@@ -3,14 +3,23 @@ S3 State Manager for Terraform state in AWS deployments.
 Handles S3 bucket creation and DynamoDB table setup in user's AWS account.
 """
 
-import boto3
+import asyncio
 import logging
+import time
+from typing import Dict, Optional
+
 from botocore.exceptions import ClientError
 
 from src.core.config import settings
+from src.services.deployment._sts_cache import get_role_client
 
 logger = logging.getLogger(__name__)
 
+# account_id -> time its state backend was last verified. The bucket and lock table
+# come from the user's CloudFormation stack, so they don't change between deploys.
+_VERIFIED_BACKEND_TTL_SECONDS = 3600
+_VERIFIED_BACKENDS: Dict[str, float] = {}
+
 
 class S3StateManager:
     """Manages S3 bucket and DynamoDB table for Terraform state."""
@@ -18,6 +27,7 @@ class S3StateManager:
     def __init__(self, role_arn: str, external_id: str):
         """
         Initialize with cross-account role credentials.
+        The role is assumed on first AWS call and re-assumed before it expires.
 
         Args:
             role_arn: IAM role ARN in user's account
@@ -25,52 +35,33 @@ class S3StateManager:
         """
         self.role_arn = role_arn
         self.external_id = external_id
-        self._credentials = None
-
-    def _get_credentials(self):
-        """Get temporary credentials by assuming user's role."""
-        if self._credentials:
-            return self._credentials
-
-        sts_client = boto3.client("sts", region_name=settings.aws_region)
+        self._account_id: Optional[str] = None
 
-        try:
-            response = sts_client.assume_role(
-                RoleArn=self.role_arn,
-                RoleSessionName="sirpi-terraform-state",
-                ExternalId=self.external_id,
-                DurationSeconds=3600,
-            )
-
-            self._credentials = response["Credentials"]
-            logger.info(f"Successfully assumed role: {self.role_arn}")
-            return self._credentials
-
-        except ClientError as e:
-            logger.error(f"Failed to assume role: {e}")
-            raise
+    def _get_client(self, service_name: str, region_name: str):
+        """Get a client for the user's role (credentials refresh automatically)."""
+        return get_role_client(
+            service_name, region_name, self.role_arn, self.external_id, "sirpi-terraform-state"
+        )
 
     def _get_s3_client(self):
         """Get S3 client with assumed role credentials."""
-        creds = self._get_credentials()
-        return boto3.client(
-            "s3",
-            aws_access_key_id=creds["AccessKeyId"],
-            aws_secret_access_key=creds["SecretAccessKey"],
-            aws_session_token=creds["SessionToken"],
-            region_name=settings.s3_region,
-        )
+        return self._get_client("s3", settings.s3_region)
 
     def _get_dynamodb_client(self):
         """Get DynamoDB client with assumed role credentials."""
-        creds = self._get_credentials()
-        return boto3.client(
-            "dynamodb",
-            aws_access_key_id=creds["AccessKeyId"],
-            aws_secret_access_key=creds["SecretAccessKey"],
-            aws_session_token=creds["SessionToken"],
-            region_name=settings.s3_region,
-        )
+        return self._get_client("dynamodb", settings.s3_region)
+
+    def _get_account_id(self) -> str:
+        """Get the user's AWS account ID (arn:aws:iam::<account>:role/...)."""
+        if self._account_id is None:
+            parts = self.role_arn.split(":")
+            if len(parts) >= 6 and parts[4].isdigit():
+                self._account_id = parts[4]
+            else:
+                # Not a plain role ARN - ask STS instead
+                sts_client = self._get_client("sts", settings.aws_region)
+                self._account_id = sts_client.get_caller_identity()["Account"]
+        return self._account_id
 
     def ensure_state_bucket(self, project_name: str) -> str:
         """
@@ -84,23 +75,17 @@ class S3StateManager:
             S3 bucket name
         """
         try:
-            s3_client = self._get_s3_client()
-
-            # Get AWS account ID from assumed role (using the assumed credentials!)
-            creds = self._get_credentials()
-            sts_client = boto3.client(
-                "sts",
-                aws_access_key_id=creds["AccessKeyId"],
-                aws_secret_access_key=creds["SecretAccessKey"],
-                aws_session_token=creds["SessionToken"],
-                region_name=settings.aws_region,
-            )
-            caller_identity = sts_client.get_caller_identity()
-            account_id = caller_identity["Account"]
+            account_id = self._get_account_id()
 
             # Bucket name from CloudFormation template
             bucket_name = f"sirpi-terraform-states-{account_id}"
 
+            verified_at = _VERIFIED_BACKENDS.get(account_id)
+            if verified_at and time.monotonic() - verified_at < _VERIFIED_BACKEND_TTL_SECONDS:
+                return bucket_name
+
+            s3_client = self._get_s3_client()
+
             # Check if bucket exists
             try:
                 s3_client.head_bucket(Bucket=bucket_name)
@@ -131,6 +116,7 @@ class S3StateManager:
                 logger.warning(f"Could not verify DynamoDB table (may be permissions): {e}")
                 logger.info(f"⚠️ Assuming lock table exists: {table_name}")
 
+            _VERIFIED_BACKENDS[account_id] = time.monotonic()
             logger.info(f"✅ S3 state backend ready: s3://{bucket_name}/projects/{project_name}")
             return bucket_name
 
@@ -173,18 +159,7 @@ class S3StateManager:
         """
         try:
             s3_client = self._get_s3_client()
-
-            # Get account ID (using assumed credentials)
-            creds = self._get_credentials()
-            sts_client = boto3.client(
-                "sts",
-                aws_access_key_id=creds["AccessKeyId"],
-                aws_secret_access_key=creds["SecretAccessKey"],
-                aws_session_token=creds["SessionToken"],
-                region_name=settings.aws_region,
-            )
-            caller_identity = sts_client.get_caller_identity()
-            account_id = caller_identity["Account"]
+            account_id = self._get_account_id()
 
             bucket_name = f"sirpi-terraform-states-{account_id}"
             state_key = f"projects/{project_name}/terraform.tfstate"
@@ -228,4 +203,5 @@ async def ensure_s3_state_bucket(role_arn: str, external_id: str, project_name:
         S3 bucket name
     """
     manager = S3StateManager(role_arn, external_id)
-    return manager.ensure_state_bucket(project_name)
+    # STS/S3/DynamoDB calls are blocking - keep them off the event loop
+    return await asyncio.to_thread(manager.ensure_state_bucket, project_name)
@@ -12,6 +12,31 @@ from src.core.config import settings
 logger = logging.getLogger(__name__)
 
 
+class SandboxLogAdapter(logging.LoggerAdapter):
+    """
+    Logger bound to a sandbox and a component.
+
+    Records go to the service's logger and, when set, the sandbox's log callback.
+    Messages take lazy %-style args: with no callback attached, formatting is left
+    to the logging machinery and skipped entirely when the level is filtered out.
+    """
+
+    def __init__(self, target: logging.Logger, sandbox: "SandboxManager", extra: Dict[str, Any]):
+        super().__init__(target, extra)
+        self.sandbox = sandbox
+
+    def log(self, level: int, msg: Any, *args: Any, **kwargs: Any) -> None:
+        callback = self.sandbox._log_callback
+        if callback is None:
+            super().log(level, msg, *args, **kwargs)
+            return
+
+        # The stream needs the text anyway - format once and share it
+        message = msg % args if args else str(msg)
+        super().log(level, message, **kwargs)
+        callback(message)
+
+
 class SandboxManager:
     """
     Unified E2B sandbox manager for both AWS and GCP deployments.
@@ -53,13 +78,27 @@ class SandboxManager:
         """Set callback function for streaming logs."""
         self._log_callback = callback
 
+    def bind_logger(self, target: logging.Logger, component: str, **extra: Any) -> SandboxLogAdapter:
+        """
+        Get a logger that also streams to this sandbox's log callback.
+
+        Args:
+            target: Logger records are emitted on (usually the caller's module logger)
+            component: Component name attached to every record
+            **extra: Additional context attached to every record
+
+        Returns:
+            Bound SandboxLogAdapter
+        """
+        return SandboxLogAdapter(target, self, {"component": component, **extra})
+
     def _log(self, message: str):
         """Internal logging that also calls callback if set."""
         logger.info(message)
         if self._log_callback:
             self._log_callback(message)
 
-    async def _ensure_docker_daemon(self):
+    async def ensure_docker_daemon(self):
         """Ensure Docker daemon is running and accessible."""
         try:
             # Check if Docker is already accessible
@@ -187,7 +226,11 @@ class SandboxManager:
             raise
 
     async def build_docker_image(
-        self, dockerfile_path: str, image_name: str, context_dir: str = "."
+        self,
+        dockerfile_path: str,
+        image_name: str,
+        context_dir: str = ".",
+        cache_from: Optional[str] = None,
     ) -> str:
         """
         Build Docker image in sandbox.
@@ -196,6 +239,9 @@ class SandboxManager:
             dockerfile_path: Path to Dockerfile
             image_name: Name and tag for the image (e.g., "myapp:latest")
             context_dir: Build context directory
+            cache_from: Optional registry image to reuse layers from. Enables BuildKit
+                        and also tags the result with this ref (with inline cache
+                        metadata) so pushing it primes the next build.
 
         Returns:
             Image name with tag
@@ -204,13 +250,20 @@ class SandboxManager:
             raise RuntimeError("Sandbox not created")
 
         # Start Docker daemon if not already running
-        await self._ensure_docker_daemon()
+        await self.ensure_docker_daemon()
 
         self._log(f"Building Docker image: {image_name}...")
 
         try:
             # Build Docker image (can take 5-10 minutes) - use run_command for streaming
-            build_cmd = f"cd {context_dir} && docker build -f {dockerfile_path} -t {image_name} ."
+            build_cmd = f"cd {context_dir} && docker build -f {dockerfile_path} -t {image_name}"
+            if cache_from:
+                build_cmd = (
+                    f"cd {context_dir} && DOCKER_BUILDKIT=1 docker build -f {dockerfile_path}"
+                    f" --cache-from {cache_from} --build-arg BUILDKIT_INLINE_CACHE=1"
+                    f" -t {image_name} -t {cache_from}"
+                )
+            build_cmd += " ."
 
             result = await self.run_command(
                 build_cmd,
@@ -235,6 +288,7 @@ class SandboxManager:
         working_dir: Optional[str] = None,
         stream_output: bool = True,
         timeout: int = 60,  # Default 60s, can be increased for long operations
+        stdin: Optional[bytes] = None,
     ) -> Dict[str, Any]:
         """
         Run arbitrary command in sandbox.
@@ -244,6 +298,9 @@ class SandboxManager:
             working_dir: Optional working directory
             stream_output: Whether to stream output via callback
             timeout: Command timeout in seconds (0 = no timeout)
+            stdin: Optional data to feed to the command's stdin. It is passed through
+                   the process environment and piped by the shell's printf builtin,
+                   so it never appears on any command line (use for secrets).
 
         Returns:
             Dict with exit_code, stdout, stderr
@@ -251,6 +308,11 @@ class SandboxManager:
         if not self.sandbox:
             raise RuntimeError("Sandbox not created")
 
+        envs = None
+        if stdin is not None:
+            envs = {"SIRPI_STDIN": stdin.decode()}
+            command = f'printf %s "$SIRPI_STDIN" | {command}'
+
         full_command = f"cd {working_dir} && {command}" if working_dir else command
 
         # Log the actual command being executed (for transparency)
@@ -261,7 +323,7 @@ class SandboxManager:
         try:
             # Pass timeout to E2B (0 = no timeout)
             result = await asyncio.to_thread(
-                self.sandbox.commands.run, full_command, timeout=timeout
+                self.sandbox.commands.run, full_command, envs=envs, timeout=timeout
             )
 
             if stream_output:
@@ -3,35 +3,165 @@ Google Cloud Storage service for artifact storage.
 Replaces S3 storage for generated files (Dockerfiles, Terraform, etc.).
 """
 
+import asyncio
+import gzip
+import io
 import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Dict, Any
 from google.cloud import storage
+from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
 from src.core.config import settings
 
 
 logger = logging.getLogger(__name__)
 
+# GCS JSON API accepts at most 100 calls per batch request
+_DELETE_BATCH_SIZE = 100
+_DELETE_BATCH_WORKERS = 8
+
+# requests defaults to 10 pooled connections per host; concurrent uploads and
+# downloads (asyncio.gather over worker threads) need more to avoid new TLS handshakes
+_HTTP_POOL_CONNECTIONS = 32
+_HTTP_POOL_MAXSIZE = 64
+
+
+def configure_http_pool(client: storage.Client) -> storage.Client:
+    """
+    Give a Storage client a larger HTTPS connection pool.
+
+    Args:
+        client: Storage client to configure
+
+    Returns:
+        The same client
+    """
+    adapter = HTTPAdapter(
+        pool_connections=_HTTP_POOL_CONNECTIONS, pool_maxsize=_HTTP_POOL_MAXSIZE
+    )
+    client._http.mount("https://", adapter)
+    return client
+
+
+# Large text artifacts (Terraform plans, generated configs) are gzip-encoded on upload
+_GZIP_MIN_BYTES = 256 * 1024
+_GZIP_CONTENT_TYPES = ("text/", "application/json", "application/x-yaml")
+_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Small artifacts (Dockerfile, main.tf) are re-read several times per deployment.
+# Entries expire after a short TTL instead of checking the object generation (which
+# would cost the metadata round-trip we're trying to save); writes from this process
+# invalidate immediately.
+_DOWNLOAD_CACHE_SIZE = 512
+_DOWNLOAD_CACHE_TTL_SECONDS = 60
+_DOWNLOAD_CACHE_MAX_BYTES = 1024 * 1024
+
+# Listing only needs object names - skip the rest of each resource's metadata
+_LIST_FIELDS = "items(name),nextPageToken"
+_LIST_PAGE_SIZE = 1000
+
+
+def list_blobs_by_prefix(bucket: storage.Bucket, prefix: str) -> List[storage.Blob]:
+    """
+    List blobs under a prefix, fetching names only (enough to download or delete).
+
+    Args:
+        bucket: Bucket to list
+        prefix: Object name prefix
+
+    Returns:
+        Blobs with only their name populated
+    """
+    return list(bucket.list_blobs(prefix=prefix, page_size=_LIST_PAGE_SIZE, fields=_LIST_FIELDS))
+
+
+def _delete_chunk(client: storage.Client, chunk: List[storage.Blob]) -> int:
+    """Delete one chunk of blobs in a single batch request."""
+    try:
+        with client.batch():
+            for blob in chunk:
+                blob.delete()
+        return len(chunk)
+    except Exception as e:
+        # Batch reports only the first failure - retry this chunk one by one
+        logger.warning(f"Batch delete failed, retrying individually: {e}")
+        count = 0
+        for blob in chunk:
+            try:
+                blob.delete()
+                count += 1
+            except Exception as exc:
+                logger.warning("Failed to delete %s: %s", blob.name, exc)
+        return count
+
+
+def delete_blobs(client: storage.Client, blobs: List[storage.Blob]) -> int:
+    """
+    Delete blobs using batch requests (up to 100 deletes per HTTP round-trip).
+
+    Batches run concurrently in worker threads; the client's batch stack is
+    thread-local, so each thread's batch collects only its own deletes.
+
+    Args:
+        client: Storage client the batches are sent through
+        blobs: Blobs to delete
+
+    Returns:
+        Number of blobs deleted
+    """
+    chunks = [
+        blobs[start:start + _DELETE_BATCH_SIZE]
+        for start in range(0, len(blobs), _DELETE_BATCH_SIZE)
+    ]
+    if len(chunks) <= 1:
+        return sum(_delete_chunk(client, chunk) for chunk in chunks)
+
+    with ThreadPoolExecutor(max_workers=min(_DELETE_BATCH_WORKERS, len(chunks))) as pool:
+        return sum(pool.map(lambda chunk: _delete_chunk(client, chunk), chunks))
+
 
 class GCSStorageService:
     """Service for storing generated artifacts in Google Cloud Storage."""
     
     def __init__(self):
-        """Initialize GCS client."""
-        self.client = storage.Client(project=settings.google_cloud_project)
+        """Initialize GCS client (no network calls - the bucket is verified on first use)."""
+        self.client = configure_http_pool(storage.Client(project=settings.google_cloud_project))
         self.bucket_name = settings.gcs_bucket_name
-        self.bucket = None
+        self._bucket: Optional[storage.Bucket] = None
+        self._bucket_lock = threading.Lock()
         
-        # Ensure bucket exists
-        self._ensure_bucket()
+        # file_path -> (content, cached_at), least recently used first
+        self._download_cache: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._download_cache_lock = threading.Lock()
+        
+        # With a local key, V4 signing is pure CPU - no IAM signBlob call per URL
+        self._signing_credentials = (
+            service_account.Credentials.from_service_account_file(settings.gcs_signing_key_path)
+            if settings.gcs_signing_key_path
+            else None
+        )
+    
+    @property
+    def bucket(self) -> storage.Bucket:
+        """Bucket handle, verified (and created if missing) on first access."""
+        if self._bucket is None:
+            with self._bucket_lock:
+                if self._bucket is None:
+                    self._ensure_bucket()
+        return self._bucket
     
     def _ensure_bucket(self):
         """Create bucket if it doesn't exist."""
         try:
-            self.bucket = self.client.get_bucket(self.bucket_name)
+            self._bucket = self.client.get_bucket(self.bucket_name)
             logger.info(f"Using existing GCS bucket: {self.bucket_name}")
         except Exception:
             logger.info(f"Creating GCS bucket: {self.bucket_name}")
-            self.bucket = self.client.create_bucket(
+            self._bucket = self.client.create_bucket(
                 self.bucket_name,
                 location=settings.gcs_bucket_region
             )
@@ -53,30 +183,73 @@ class GCSStorageService:
         Returns:
             Public URL to the file
         """
+        self._invalidate_downloads(file_path)
         blob = self.bucket.blob(file_path)
-        blob.upload_from_string(content, content_type=content_type)
+        data = content.encode("utf-8")
+        
+        if len(data) > _GZIP_MIN_BYTES and content_type.startswith(_GZIP_CONTENT_TYPES):
+            # Store gzip-encoded; GCS transcodes and the client decodes on download
+            data = gzip.compress(data)
+            blob.content_encoding = "gzip"
+            blob.chunk_size = _UPLOAD_CHUNK_SIZE
+            blob.upload_from_file(io.BytesIO(data), size=len(data), content_type=content_type)
+        else:
+            blob.upload_from_string(data, content_type=content_type)
         
-        logger.info(f"Uploaded to GCS: gs://{self.bucket_name}/{file_path}")
+        logger.info("Uploaded to GCS: gs://%s/%s", self.bucket_name, file_path)
         
         return f"gs://{self.bucket_name}/{file_path}"
     
-    def download_file(self, file_path: str) -> Optional[str]:
+    def download_file(self, file_path: str) -> Optional[bytes]:
         """
-        Download file content from GCS.
+        Download raw file content from GCS (CRC32C-verified).
         
         Args:
             file_path: Path within bucket
             
         Returns:
-            File content as string, or None if not found
+            File content as bytes, or None if not found
         """
+        with self._download_cache_lock:
+            cached = self._download_cache.get(file_path)
+            if cached and time.monotonic() - cached[1] < _DOWNLOAD_CACHE_TTL_SECONDS:
+                self._download_cache.move_to_end(file_path)
+                return cached[0]
+        
         try:
             blob = self.bucket.blob(file_path)
-            content = blob.download_as_text()
-            return content
+            content = blob.download_as_bytes(checksum="crc32c")
         except Exception as e:
-            logger.warning(f"Failed to download {file_path}: {e}")
+            logger.warning("Failed to download %s: %s", file_path, e)
             return None
+        
+        if len(content) <= _DOWNLOAD_CACHE_MAX_BYTES:
+            with self._download_cache_lock:
+                self._download_cache[file_path] = (content, time.monotonic())
+                self._download_cache.move_to_end(file_path)
+                if len(self._download_cache) > _DOWNLOAD_CACHE_SIZE:
+                    self._download_cache.popitem(last=False)
+        
+        return content
+    
+    def _invalidate_downloads(self, prefix: str) -> None:
+        """Drop cached downloads for a path (or every path under a prefix)."""
+        with self._download_cache_lock:
+            for path in [p for p in self._download_cache if p.startswith(prefix)]:
+                del self._download_cache[path]
+    
+    def download_text(self, file_path: str) -> Optional[str]:
+        """
+        Download file content from GCS as text.
+        
+        Args:
+            file_path: Path within bucket
+            
+        Returns:
+            File content as UTF-8 string, or None if not found
+        """
+        content = self.download_file(file_path)
+        return content.decode("utf-8") if content is not None else None
     
     def delete_file(self, file_path: str) -> bool:
         """
@@ -88,13 +261,14 @@ class GCSStorageService:
         Returns:
             True if deleted, False otherwise
         """
+        self._invalidate_downloads(file_path)
         try:
             blob = self.bucket.blob(file_path)
             blob.delete()
-            logger.info(f"Deleted from GCS: {file_path}")
+            logger.info("Deleted from GCS: %s", file_path)
             return True
         except Exception as e:
-            logger.warning(f"Failed to delete {file_path}: {e}")
+            logger.warning("Failed to delete %s: %s", file_path, e)
             return False
     
     def delete_repository_files(self, owner: str, repo: str) -> int:
@@ -109,16 +283,9 @@ class GCSStorageService:
             Number of files deleted
         """
         prefix = f"{owner}/{repo}/"
-        blobs = list(self.bucket.list_blobs(prefix=prefix))
-        count = 0
-        
-        for blob in blobs:
-            try:
-                blob.delete()
-                count += 1
-                logger.debug(f"Deleted old file: {blob.name}")
-            except Exception as e:
-                logger.warning(f"Failed to delete {blob.name}: {e}")
+        self._invalidate_downloads(prefix)
+        blobs = list_blobs_by_prefix(self.bucket, prefix)
+        count = delete_blobs(self.client, blobs)
         
         if count > 0:
             logger.info(f"Deleted {count} old files from {prefix}")
@@ -135,8 +302,7 @@ class GCSStorageService:
         Returns:
             List of file paths
         """
-        blobs = self.client.list_blobs(self.bucket_name, prefix=prefix)
-        return [blob.name for blob in blobs]
+        return [blob.name for blob in list_blobs_by_prefix(self.bucket, prefix)]
     
     def get_signed_url(self, file_path: str, expiration_minutes: int = 60) -> str:
         """
@@ -155,25 +321,67 @@ class GCSStorageService:
         url = blob.generate_signed_url(
             version="v4",
             expiration=timedelta(minutes=expiration_minutes),
-            method="GET"
+            method="GET",
+            credentials=self._signing_credentials
         )
         return url
     
+    # Async counterparts for request handlers: the google-cloud-storage client is
+    # blocking, so these run it in a worker thread instead of on the event loop.
+    
+    async def upload_file_async(
+        self,
+        content: str,
+        file_path: str,
+        content_type: str = "text/plain"
+    ) -> str:
+        """Async version of upload_file."""
+        return await asyncio.to_thread(self.upload_file, content, file_path, content_type)
+    
+    async def download_file_async(self, file_path: str) -> Optional[bytes]:
+        """Async version of download_file."""
+        return await asyncio.to_thread(self.download_file, file_path)
+    
+    async def download_text_async(self, file_path: str) -> Optional[str]:
+        """Async version of download_text."""
+        return await asyncio.to_thread(self.download_text, file_path)
+    
+    async def delete_file_async(self, file_path: str) -> bool:
+        """Async version of delete_file."""
+        return await asyncio.to_thread(self.delete_file, file_path)
+    
+    async def delete_repository_files_async(self, owner: str, repo: str) -> int:
+        """Async version of delete_repository_files."""
+        return await asyncio.to_thread(self.delete_repository_files, owner, repo)
+    
+    async def list_files_async(self, prefix: str) -> list[str]:
+        """Async version of list_files."""
+        return await asyncio.to_thread(self.list_files, prefix)
+    
     async def get_repository_files(self, owner: str, repo: str) -> list[dict[str, str]]:
         """Get all files for a repository from GCS."""
         prefix = f"{owner}/{repo}/"
-        file_paths = self.list_files(prefix)
+        blobs = await asyncio.to_thread(lambda: list_blobs_by_prefix(self.bucket, prefix))
+        
+        # Download concurrently through the download cache (failures come back as None)
+        contents = await asyncio.gather(
+            *[asyncio.to_thread(self.download_file, blob.name) for blob in blobs]
+        )
         
         files = []
-        for file_path in file_paths:
-            # Extract just the filename part
-            filename = file_path[len(prefix):]
-            content = self.download_file(file_path)
-            
+        for blob, content in zip(blobs, contents):
             if content:
+                # Extract just the filename part
+                filename = blob.name[len(prefix):]
+                try:
+                    text = content.decode("utf-8")
+                except UnicodeDecodeError:
+                    # One binary file shouldn't fail the whole listing
+                    logger.warning(f"Skipping non-UTF-8 file {blob.name}")
+                    continue
                 files.append({
                     "path": filename,
-                    "content": content,
+                    "content": text,
                     "description": f"Generated {filename}"
                 })
         
@@ -181,7 +389,7 @@ class GCSStorageService:
     
     async def get_download_urls(self, gcs_keys: list[str]) -> dict[str, str]:
         """Generate download URLs for multiple files."""
-        urls = {}
+        paths = {}
         for gcs_key in gcs_keys:
             # Extract path from GCS URL
             if gcs_key.startswith("gs://"):
@@ -191,12 +399,17 @@ class GCSStorageService:
             
             # Get just the filename for the key in returned dict
             filename = path.split("/")[-1]
-            
-            # For now, return the GCS URI directly (no signed URL)
-            # TODO: Set up service account for signed URLs
-            urls[filename] = gcs_key
+            paths[filename] = (gcs_key, path)
         
-        return urls
+        if not self._signing_credentials:
+            # No signing key configured - return the GCS URIs directly
+            return {filename: gcs_key for filename, (gcs_key, _) in paths.items()}
+        
+        # Sign all URLs concurrently
+        signed_urls = await asyncio.gather(
+            *[asyncio.to_thread(self.get_signed_url, path) for _, path in paths.values()]
+        )
+        return dict(zip(paths.keys(), signed_urls))
 
 
 # Singleton instance
@@ -4,25 +4,58 @@ Conversational agent for helping users with deployment questions, logs, status c
 """
 
 import logging
-from typing import Optional, AsyncGenerator
-import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, AsyncGenerator
 
 # Google ADK imports
 from google.adk.agents import Agent
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from google.adk.sessions import BaseSessionService, DatabaseSessionService, InMemorySessionService
 from google.adk.tools import ToolContext
+from google.cloud import run_v2
 from google.genai import types
+from sqlalchemy import text
 
 from src.core.config import settings
 from src.services.supabase import get_supabase_service
+from src.utils.background import run_in_background
 
 
 logger = logging.getLogger(__name__)
 
+# Assistant chats live under their own ADK app name so they can be expired without
+# touching the orchestrator's workflow sessions (same session tables)
+_ASSISTANT_APP_NAME = f"{settings.adk_app_name}-assistant"
+_SESSION_TTL_HOURS = 24
+_SESSION_PRUNE_INTERVAL_SECONDS = 3600
+
+# Cloud Run service lookups are rate-limited and slow; repeat questions reuse a recent answer
+_SERVICE_CACHE_SIZE = 512
+_SERVICE_CACHE_TTL_SECONDS = 30
+_service_cache: OrderedDict[tuple[str, str, str], tuple[dict, float]] = OrderedDict()
+_service_cache_lock = threading.Lock()
+
+_cloud_run_client: Optional[run_v2.ServicesClient] = None
+
+
+def _get_cloud_run_client() -> run_v2.ServicesClient:
+    """Create the Cloud Run client once - it loads credentials and opens a gRPC channel."""
+    global _cloud_run_client
+    
+    if _cloud_run_client is None:
+        with _service_cache_lock:
+            if _cloud_run_client is None:
+                _cloud_run_client = run_v2.ServicesClient()
+    
+    return _cloud_run_client
+
 
 def query_deployment_status(
-    project_id: int,
+    project_id: str,
     tool_context: ToolContext = None
 ) -> dict:
     """
@@ -38,41 +71,49 @@ def query_deployment_status(
     try:
         supabase = get_supabase_service()
         
-        # Query project and latest deployment
-        from src.models.schemas import Project, Deployment
-        from sqlalchemy import select
-        
+        # Project and its latest deployment run in one round-trip;
+        # timestamps come back as ISO-8601 text, so no datetime objects are built
         with supabase.get_session() as db:
-            project = db.execute(
-                select(Project).where(Project.id == project_id)
-            ).scalar_one_or_none()
+            row = db.execute(
+                text(
+                    """
+                    SELECT p.repository_name, p.deployment_status, p.cloud_provider,
+                           p.application_url,
+                           to_json(p.updated_at) #>> '{}' AS updated_at,
+                           d.id AS deployment_id, d.status AS log_status,
+                           to_json(d.created_at) #>> '{}' AS deployed_at
+                    FROM projects p
+                    LEFT JOIN LATERAL (
+                        SELECT id, status, created_at
+                        FROM deployment_logs
+                        WHERE project_id = p.id
+                        ORDER BY created_at DESC
+                        LIMIT 1
+                    ) d ON true
+                    WHERE p.id = :project_id
+                    """
+                ),
+                {"project_id": project_id},
+            ).mappings().first()
             
-            if not project:
+            if not row:
                 return {"error": "Project not found", "project_id": project_id}
             
-            # Get latest deployment
-            latest_deployment = db.execute(
-                select(Deployment)
-                .where(Deployment.project_id == project_id)
-                .order_by(Deployment.created_at.desc())
-                .limit(1)
-            ).scalar_one_or_none()
-            
-            if not latest_deployment:
+            if not row["deployment_status"] and not row["deployment_id"]:
                 return {
-                    "project_name": project.repo_name,
+                    "project_name": row["repository_name"],
                     "status": "no_deployments",
                     "message": "No deployments found for this project"
                 }
             
             return {
-                "project_name": project.repo_name,
-                "deployment_id": latest_deployment.id,
-                "status": latest_deployment.status,
-                "cloud_provider": latest_deployment.cloud_provider or "gcp",
-                "service_url": latest_deployment.service_url,
-                "created_at": latest_deployment.created_at.isoformat(),
-                "updated_at": latest_deployment.updated_at.isoformat()
+                "project_name": row["repository_name"],
+                "deployment_id": str(row["deployment_id"]) if row["deployment_id"] else None,
+                "status": row["deployment_status"] or row["log_status"],
+                "cloud_provider": row["cloud_provider"] or "gcp",
+                "service_url": row["application_url"],
+                "created_at": row["deployed_at"],
+                "updated_at": row["updated_at"]
             }
         
     except Exception as e:
@@ -81,7 +122,7 @@ def query_deployment_status(
 
 
 def get_deployment_logs(
-    project_id: int,
+    project_id: str,
     limit: int = 50,
     tool_context: ToolContext = None
 ) -> dict:
@@ -99,29 +140,42 @@ def get_deployment_logs(
     try:
         supabase = get_supabase_service()
         
-        from src.models.schemas import DeploymentLog
-        from sqlalchemy import select
-        
+        # Newest `limit` lines picked by the DB, then re-sorted chronologically there too
         with supabase.get_session() as db:
-            logs = db.execute(
-                select(DeploymentLog)
-                .where(DeploymentLog.project_id == project_id)
-                .order_by(DeploymentLog.created_at.desc())
-                .limit(limit)
-            ).scalars().all()
+            rows = db.execute(
+                text(
+                    """
+                    SELECT to_json(created_at) #>> '{}' AS created_at,
+                           status, operation_type, line
+                    FROM (
+                        SELECT l.created_at, l.status, l.operation_type, e.line, e.n
+                        FROM deployment_logs l
+                        CROSS JOIN LATERAL jsonb_array_elements_text(l.logs)
+                            WITH ORDINALITY AS e(line, n)
+                        WHERE l.project_id = :project_id
+                        ORDER BY l.created_at DESC, e.n DESC
+                        LIMIT :limit
+                    ) recent
+                    ORDER BY recent.created_at, n
+                    """
+                ),
+                {"project_id": project_id, "limit": limit},
+            ).mappings()
+            
+            logs = [
+                {
+                    "timestamp": row["created_at"],
+                    "level": row["status"],
+                    "message": row["line"],
+                    "agent_name": row["operation_type"]
+                }
+                for row in rows
+            ]
             
             return {
                 "project_id": project_id,
                 "log_count": len(logs),
-                "logs": [
-                    {
-                        "timestamp": log.created_at.isoformat(),
-                        "level": log.level,
-                        "message": log.message,
-                        "agent_name": log.agent_name
-                    }
-                    for log in reversed(logs)  # Chronological order
-                ]
+                "logs": logs
             }
         
     except Exception as e:
@@ -147,15 +201,20 @@ def check_gcp_resource(
     Returns:
         Service status information
     """
+    cache_key = (project_id, region, service_name)
+    with _service_cache_lock:
+        cached = _service_cache.get(cache_key)
+        if cached and time.monotonic() - cached[1] < _SERVICE_CACHE_TTL_SECONDS:
+            _service_cache.move_to_end(cache_key)
+            return cached[0]
+    
     try:
-        from google.cloud import run_v2
-        
-        client = run_v2.ServicesClient()
+        client = _get_cloud_run_client()
         service_path = f"projects/{project_id}/locations/{region}/services/{service_name}"
         
         service = client.get_service(name=service_path)
         
-        return {
+        result = {
             "service_name": service_name,
             "status": "RUNNING" if service.terminal_condition.state == 1 else "UNKNOWN",
             "url": service.uri,
@@ -163,6 +222,15 @@ def check_gcp_resource(
             "creation_time": service.create_time.isoformat() if service.create_time else None
         }
         
+        # Only successful lookups are cached - errors are retried on the next question
+        with _service_cache_lock:
+            _service_cache[cache_key] = (result, time.monotonic())
+            _service_cache.move_to_end(cache_key)
+            if len(_service_cache) > _SERVICE_CACHE_SIZE:
+                _service_cache.popitem(last=False)
+        
+        return result
+        
     except Exception as e:
         logger.warning(f"Failed to check GCP resource: {e}")
         return {
@@ -171,42 +239,44 @@ def check_gcp_resource(
         }
 
 
+def _prune_expired_sessions() -> None:
+    """Delete assistant chat sessions idle for over 24h (ADK cascades their events)."""
+    supabase = get_supabase_service()
+    
+    with supabase.get_session() as db:
+        result = db.execute(
+            text(
+                """
+                DELETE FROM sessions
+                WHERE app_name = :app_name
+                  AND update_time < NOW() - make_interval(hours => :hours)
+                """
+            ),
+            {"app_name": _ASSISTANT_APP_NAME, "hours": _SESSION_TTL_HOURS},
+        )
+    
+    if result.rowcount:
+        logger.info(f"Pruned {result.rowcount} expired assistant session(s)")
+
+
+@dataclass(slots=True)
+class ChatEvent:
+    """One streamed assistant event (fixed layout - no per-event dict)."""
+    type: str  # "partial", "final" or "error"
+    content: str = ""
+    tool_calls: Optional[List[Dict[str, Any]]] = None
+    tool_responses: Optional[List[Dict[str, Any]]] = None
+    error: Optional[str] = None
+
+
 class SirpiAssistant:
     """
     Conversational AI assistant for Sirpi using Google ADK.
     Helps users check deployment status, view logs, and troubleshoot.
     """
     
-    def __init__(self, model: str = "gemini-2.5-flash"):
-        """Initialize assistant with Gemini model."""
-        self.model = model
-        self.session_service = InMemorySessionService()
-        
-        # Create ADK agent with tools
-        self.agent = Agent(
-            name="SirpiAssistant",
-            model=self.model,
-            description="AI assistant for Sirpi deployment platform",
-            instruction=self._get_instruction(),
-            tools=[
-                query_deployment_status,
-                get_deployment_logs,
-                check_gcp_resource
-            ]
-        )
-        
-        # Create runner
-        self.runner = Runner(
-            agent=self.agent,
-            app_name=settings.adk_app_name,
-            session_service=self.session_service
-        )
-        
-        logger.info("Sirpi Assistant initialized with Google ADK")
-    
-    def _get_instruction(self) -> str:
-        """System instruction for the assistant."""
-        return """You are Sirpi Assistant, an expert AI helper for the Sirpi DevOps automation platform.
+    # System instruction - shared by every instance and stable for prompt caching
+    _INSTRUCTION = """You are Sirpi Assistant, an expert AI helper for the Sirpi DevOps automation platform.
 
 **Your capabilities:**
 - Check deployment status using query_deployment_status tool
@@ -227,12 +297,76 @@ class SirpiAssistant:
 
 When users ask about deployments, status, logs, or resources, use the appropriate tool to get current information."""
     
+    _TOOLS = (
+        query_deployment_status,
+        get_deployment_logs,
+        check_gcp_resource
+    )
+    
+    def __init__(
+        self,
+        model: str = "gemini-2.5-flash",
+        session_service: Optional[BaseSessionService] = None
+    ):
+        """
+        Initialize assistant with Gemini model.
+        
+        Args:
+            model: Gemini model name
+            session_service: ADK session service (defaults to the configured shared one)
+        """
+        self.model = model
+        self.session_service = session_service or self._create_session_service()
+        self._last_prune = 0.0
+        
+        # Create ADK agent with tools
+        self.agent = Agent(
+            name="SirpiAssistant",
+            model=self.model,
+            description="AI assistant for Sirpi deployment platform",
+            instruction=self._INSTRUCTION,
+            tools=list(self._TOOLS)
+        )
+        
+        # Create runner
+        self.runner = Runner(
+            agent=self.agent,
+            app_name=_ASSISTANT_APP_NAME,
+            session_service=self.session_service
+        )
+        
+        logger.info("Sirpi Assistant initialized with Google ADK")
+    
+    @staticmethod
+    def _create_session_service() -> BaseSessionService:
+        """
+        Create ADK session service based on configuration.
+        The database service keeps chat sessions in Supabase so every worker sees them.
+        """
+        if settings.adk_session_service_type == "database":
+            logger.info("Assistant using DatabaseSessionService with Supabase")
+            return DatabaseSessionService(db_url=settings.adk_session_db_url)
+        logger.info("Assistant using InMemorySessionService")
+        return InMemorySessionService()
+    
+    def _maybe_prune_sessions(self) -> None:
+        """Expire old database-backed chat sessions, at most once an hour, off the request path."""
+        if not isinstance(self.session_service, DatabaseSessionService):
+            return
+        
+        now = time.monotonic()
+        if now - self._last_prune < _SESSION_PRUNE_INTERVAL_SECONDS:
+            return
+        
+        self._last_prune = now
+        run_in_background("assistant_session_prune", _prune_expired_sessions)
+    
     async def chat(
         self,
         user_message: str,
         user_id: str,
         session_id: Optional[str] = None
-    ) -> AsyncGenerator[dict, None]:
+    ) -> AsyncGenerator[ChatEvent, None]:
         """
         Stream chat response from assistant.
         
@@ -242,12 +376,14 @@ When users ask about deployments, status, logs, or resources, use the appropriat
             session_id: Session ID (created if None)
             
         Yields:
-            Event dictionaries with partial or final responses
+            ChatEvent with partial or final responses. Unpopulated tool
+            fields are None, and events carrying nothing are skipped.
         """
         # Create or get session
         if not session_id:
-            session = self.session_service.create_session(
-                app_name=settings.adk_app_name,
+            self._maybe_prune_sessions()
+            session = await self.session_service.create_session(
+                app_name=_ASSISTANT_APP_NAME,
                 user_id=user_id
             )
             session_id = session.id
@@ -267,53 +403,47 @@ When users ask about deployments, status, logs, or resources, use the appropriat
                 session_id=session_id,
                 new_message=content
             ):
-                # Convert event to dict for API response
-                event_dict = {
-                    "type": "partial" if event.partial else "final",
-                    "content": "",
-                    "tool_calls": [],
-                    "tool_responses": []
-                }
-                
-                # Extract text content
+                # Extract text content (last text part wins)
+                reply_text = None
                 if event.content and event.content.parts:
                     for part in event.content.parts:
-                        if hasattr(part, 'text') and part.text:
-                            event_dict["content"] = part.text
+                        if getattr(part, 'text', None):
+                            reply_text = part.text
                 
-                # Extract tool calls
-                if hasattr(event, 'get_function_calls'):
-                    function_calls = event.get_function_calls()
-                    if function_calls:
-                        event_dict["tool_calls"] = [
-                            {
-                                "name": fc.name,
-                                "args": fc.args
-                            }
-                            for fc in function_calls
-                        ]
+                # Extract tool calls and responses (always defined on ADK's Event)
+                function_calls = event.get_function_calls()
+                function_responses = event.get_function_responses()
                 
-                # Extract tool responses
-                if hasattr(event, 'get_function_responses'):
-                    function_responses = event.get_function_responses()
-                    if function_responses:
-                        event_dict["tool_responses"] = [
-                            {
-                                "name": fr.name,
-                                "response": fr.response
-                            }
-                            for fr in function_responses
-                        ]
+                # Nothing to report - don't push an empty frame through the stream
+                if not (reply_text or function_calls or function_responses):
+                    continue
                 
-                yield event_dict
+                yield ChatEvent(
+                    type="partial" if event.partial else "final",
+                    content=reply_text or "",
+                    tool_calls=[
+                        {
+                            "name": fc.name,
+                            "args": fc.args
+                        }
+                        for fc in function_calls
+                    ] if function_calls else None,
+                    tool_responses=[
+                        {
+                            "name": fr.name,
+                            "response": fr.response
+                        }
+                        for fr in function_responses
+                    ] if function_responses else None
+                )
                 
         except Exception as e:
             logger.error(f"Assistant chat failed: {e}", exc_info=True)
-            yield {
-                "type": "error",
-                "content": f"Sorry, I encountered an error: {str(e)}",
-                "error": str(e)
-            }
+            yield ChatEvent(
+                type="error",
+                content=f"Sorry, I encountered an error: {str(e)}",
+                error=str(e)
+            )
     
     async def chat_simple(
         self,
@@ -334,12 +464,14 @@ When users ask about deployments, status, logs, or resources, use the appropriat
         """
         full_response = ""
         
-        async for event in self.chat(user_message, user_id, session_id):
-            if event["type"] == "final" and event["content"]:
-                full_response = event["content"]
-                break
-            elif event["type"] == "partial" and event["content"]:
-                full_response += event["content"]
+        # aclosing() closes the stream on break so the ADK run is torn down now, not at GC
+        async with aclosing(self.chat(user_message, user_id, session_id)) as events:
+            async for event in events:
+                if event.type == "final" and event.content:
+                    full_response = event.content
+                    break
+                elif event.type == "partial" and event.content:
+                    full_response += event.content
         
         return full_response if full_response else "I couldn't process that request."
 
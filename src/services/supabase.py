@@ -3,6 +3,7 @@ Supabase database service - Production ready.
 Uses Transaction Pooler (Port 6543) optimized for AWS Lambda.
 """
 
+import asyncio
 import logging
 from contextlib import contextmanager
 from typing import Optional, Dict, Any, List
@@ -144,13 +145,8 @@ class SupabaseService:
             logger.error(f"Database connection failed: {type(e).__name__}")
             raise DatabaseError("Unable to connect to database")
 
-    async def health_check(self) -> Dict[str, Any]:
-        """
-        Check database connectivity and return status.
-
-        Returns:
-            Dict with status and latency
-        """
+    def _db_ping(self) -> Dict[str, Any]:
+        """Blocking connectivity probe: connect, SELECT 1, measure latency."""
         import time
 
         start = time.time()
@@ -168,6 +164,16 @@ class SupabaseService:
             logger.error(f"Database health check failed: {type(e).__name__}")
             return {"status": "unhealthy", "error": "Connection failed"}
 
+    async def health_check(self) -> Dict[str, Any]:
+        """
+        Check database connectivity and return status.
+        The probe runs in a worker thread so callers' timeouts and concurrency apply.
+
+        Returns:
+            Dict with status and latency
+        """
+        return await asyncio.to_thread(self._db_ping)
+
     def save_generation(
         self,
         user_id: str,
@@ -1052,7 +1058,8 @@ class SupabaseService:
                     cur.execute(
                         """
                         SELECT id, user_id, project_id, access_token, refresh_token, 
-                               token_expiry, status, verified_at, updated_at
+                               token_expiry::timestamptz AS token_expiry,
+                               status, verified_at, updated_at
                         FROM gcp_credentials
                         WHERE user_id = %s AND status = 'active'
                         ORDER BY created_at DESC
@@ -0,0 +1,35 @@
+"""
+Fire-and-forget helpers for blocking side effects (mostly DB writes)
+that callers shouldn't wait on.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Strong references to in-flight background writes (asyncio only keeps weak refs)
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _log_background_failure(task: asyncio.Task):
+    """Done-callback: drop the task reference and surface any failure."""
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Background {task.get_name()} failed: {task.exception()}")
+
+
+def run_in_background(name: str, func, *args):
+    """
+    Run a blocking DB write off the response path.
+    Falls back to running inline when called outside the event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        func(*args)
+        return
+
+    task = asyncio.create_task(asyncio.to_thread(func, *args), name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_log_background_failure)
@@ -1,47 +1,94 @@
 """
 Encryption utilities for sensitive data storage.
-Uses Fernet (AES-256) for symmetric encryption.
+Uses AES-256-GCM for symmetric encryption; values written by the previous
+Fernet scheme are still decrypted transparently.
 """
 
 import base64
 import logging
+import os
+import re
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from src.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Marks AES-GCM ciphertexts; anything else is a legacy Fernet token ("gAAAAA...")
+_AESGCM_PREFIX = "v2:"
+_NONCE_SIZE = 12
+
+# Cheap shape check for our own ciphertexts (AES-GCM or Fernet, urlsafe base64)
+_LOOKS_ENCRYPTED = re.compile(r"(?:v2:|gAAAAA)[A-Za-z0-9_\-]{38,}={0,2}")
+
 
 class EncryptionService:
     """Service for encrypting/decrypting sensitive data."""
     
     def __init__(self):
         """Initialize encryption service with master key."""
-        self._cipher = None
+        # Get master key from environment
+        master_key = settings.encryption_master_key
+        
+        if not master_key:
+            # Generate a key for development (DON'T DO THIS IN PRODUCTION!)
+            logger.warning("No ENCRYPTION_MASTER_KEY set - generating temporary key")
+            master_key = Fernet.generate_key().decode()
+        
+        # Ensure key is bytes
+        if isinstance(master_key, str):
+            master_key = master_key.encode()
+        
+        # Legacy cipher, kept to read values encrypted before the AES-GCM switch
+        self._cipher = Fernet(master_key)
+        
+        # Derive a separate AES-256 key rather than reusing Fernet's key material
+        aead_key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b"sirpi-encryption-aes-gcm",
+        ).derive(base64.urlsafe_b64decode(master_key))
+        self._aead = AESGCM(aead_key)
+        
+        # Bound once so encrypt/decrypt are a single method call on the hot path
+        self._enc = self._aead.encrypt
+        self._dec = self._aead.decrypt
+        self._legacy_dec = self._cipher.decrypt
     
     @property
     def cipher(self) -> Fernet:
-        """Get or create Fernet cipher."""
-        if self._cipher is None:
-            # Get master key from environment
-            master_key = getattr(settings, 'encryption_master_key', None)
-            
-            if not master_key:
-                # Generate a key for development (DON'T DO THIS IN PRODUCTION!)
-                logger.warning("No ENCRYPTION_MASTER_KEY set - generating temporary key")
-                master_key = Fernet.generate_key().decode()
-            
-            # Ensure key is bytes
-            if isinstance(master_key, str):
-                master_key = master_key.encode()
-            
-            self._cipher = Fernet(master_key)
-        
+        """Legacy Fernet cipher built from the master key."""
         return self._cipher
     
     def encrypt(self, plaintext: str) -> str:
         """
         Encrypt plaintext string.
         
+        Values that are already ciphertexts produced with this key are returned
+        unchanged, so re-saving a stored value never double-encrypts it. Use
+        encrypt_raw to always encrypt.
+        
+        Args:
+            plaintext: Data to encrypt
+            
+        Returns:
+            Encrypted string (base64 encoded)
+        """
+        if not plaintext:
+            return ""
+        
+        if _LOOKS_ENCRYPTED.fullmatch(plaintext) and self._is_own_ciphertext(plaintext):
+            return plaintext
+        
+        return self.encrypt_raw(plaintext)
+    
+    def encrypt_raw(self, plaintext: str) -> str:
+        """
+        Encrypt plaintext string without the already-encrypted check.
+        
         Args:
             plaintext: Data to encrypt
             
@@ -52,12 +99,28 @@ class EncryptionService:
             return ""
         
         try:
-            encrypted_bytes = self.cipher.encrypt(plaintext.encode())
-            return encrypted_bytes.decode()
+            nonce = os.urandom(_NONCE_SIZE)
+            sealed = self._enc(nonce, plaintext.encode(), None)
+            return _AESGCM_PREFIX + base64.urlsafe_b64encode(nonce + sealed).decode()
         except Exception as e:
             logger.error(f"Encryption failed: {e}")
             raise ValueError("Failed to encrypt data")
     
+    def _is_own_ciphertext(self, value: str) -> bool:
+        """
+        Check whether value authenticates under our key.
+        The prefix alone isn't proof - user data (e.g. env vars) may look alike.
+        """
+        try:
+            if value.startswith(_AESGCM_PREFIX):
+                raw = base64.urlsafe_b64decode(value[len(_AESGCM_PREFIX):])
+                self._dec(raw[:_NONCE_SIZE], raw[_NONCE_SIZE:], None)
+            else:
+                self._legacy_dec(value.encode())
+            return True
+        except Exception:
+            return False
+    
     def decrypt(self, encrypted: str) -> str:
         """
         Decrypt encrypted string.
@@ -72,8 +135,11 @@ class EncryptionService:
             return ""
         
         try:
-            decrypted_bytes = self.cipher.decrypt(encrypted.encode())
-            return decrypted_bytes.decode()
+            if not encrypted.startswith(_AESGCM_PREFIX):
+                return self._legacy_dec(encrypted.encode()).decode()
+            
+            raw = base64.urlsafe_b64decode(encrypted[len(_AESGCM_PREFIX):])
+            return self._dec(raw[:_NONCE_SIZE], raw[_NONCE_SIZE:], None).decode()
         except Exception as e:
             logger.error(f"Decryption failed: {e}")
             raise ValueError("Failed to decrypt data")
@@ -87,26 +153,15 @@ class EncryptionService:
         return {k: self.decrypt(v) for k, v in encrypted_data.items()}
 
 
-# Global singleton
-_encryption_service: EncryptionService = None
+# Global singleton (built at import - the key comes from settings, which are already loaded)
+_encryption_service = EncryptionService()
 
 
 def get_encryption_service() -> EncryptionService:
-    """Get or create singleton encryption service."""
-    global _encryption_service
-    
-    if _encryption_service is None:
-        _encryption_service = EncryptionService()
-    
+    """Get singleton encryption service."""
     return _encryption_service
 
 
-# Convenience functions
-def encrypt_value(plaintext: str) -> str:
-    """Encrypt a value."""
-    return get_encryption_service().encrypt(plaintext)
-
-
-def decrypt_value(encrypted: str) -> str:
-    """Decrypt a value."""
-    return get_encryption_service().decrypt(encrypted)
+# Convenience functions - bound methods, so callers skip the singleton lookup
+encrypt_value = _encryption_service.encrypt
+decrypt_value = _encryption_service.decrypt
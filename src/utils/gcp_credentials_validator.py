@@ -6,17 +6,40 @@ Prompts reconnection if expired or missing.
 """
 
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Tuple
+import requests
+from requests.adapters import HTTPAdapter
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from google.auth.exceptions import RefreshError
 
 from src.services.supabase import supabase
-from src.utils.encryption import decrypt_value as decrypt
+from src.utils.encryption import decrypt_value as decrypt, encrypt_value
 from src.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Valid check results are reused for a short while - token expiry is stable
+# and most deployment actions check credentials several times in a row
+_CRED_CACHE_TTL_SECONDS = 60
+_CRED_CACHE_SIZE = 1024
+_cred_cache: OrderedDict[Tuple[str, str], Tuple[float, dict]] = OrderedDict()
+_cred_cache_lock = threading.Lock()
+
+_UTC = timezone.utc
+# Tokens live 60 minutes; refresh once they are this old
+_REFRESH_THRESHOLD = timedelta(minutes=50)
+_CACHE_MARGIN = timedelta(seconds=_CRED_CACHE_TTL_SECONDS)
+
+# One pooled session for OAuth token refreshes - keeps TLS to oauth2.googleapis.com alive
+_auth_session = requests.Session()
+_auth_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+auth_request = Request(session=_auth_session)
+
 
 class CredentialStatus:
     """Credential validation status."""
@@ -27,30 +50,12 @@ class CredentialStatus:
     MISSING = "missing"
 
 
-def _get_gcp_credentials(user_id: str, project_id: str) -> Credentials:
-    """Get refreshed GCP credentials for deployment (internal helper)."""
-    with supabase.get_connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT access_token, refresh_token, token_expiry
-                FROM gcp_credentials
-                WHERE user_id = %s AND project_id = %s AND status = 'active'
-                """,
-                (user_id, project_id),
-            )
-            cred = cur.fetchone()
-
-    if not cred:
-        raise ValueError(f"GCP credentials not found for project {project_id}")
-
-    # Decrypt tokens
-    from src.utils.encryption import decrypt_value as decrypt
-
+def _credentials_from_row(cred: dict) -> Credentials:
+    """Build OAuth credentials from a gcp_credentials row (decrypting the tokens)."""
     access_token = decrypt(cred["access_token"])
     refresh_token = decrypt(cred["refresh_token"]) if cred.get("refresh_token") else None
 
-    credentials = Credentials(
+    return Credentials(
         token=access_token,
         refresh_token=refresh_token,
         token_uri="https://oauth2.googleapis.com/token",
@@ -58,13 +63,47 @@ def _get_gcp_credentials(user_id: str, project_id: str) -> Credentials:
         client_secret=settings.gcp_oauth_client_secret,
     )
 
-    return credentials
+
+def _refresh_and_store(credentials: Credentials, user_id: str, project_id: str) -> None:
+    """
+    Refresh the access token and persist it in a single UPDATE ... RETURNING.
+    The write stays synchronous: callers read the token straight back from the DB.
+    """
+    credentials.refresh(auth_request)
+
+    with supabase.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE gcp_credentials
+                SET access_token = %s,
+                    token_expiry = %s,
+                    updated_at = NOW()
+                WHERE user_id = %s AND project_id = %s
+                RETURNING token_expiry
+                """,
+                (encrypt_value(credentials.token), credentials.expiry, user_id, project_id),
+            )
+            row = cur.fetchone()
+
+    logger.info(f"Stored refreshed token, new expiry: {row['token_expiry'] if row else None}")
+
+
+def invalidate_gcp_credentials_cache(user_id: str) -> None:
+    """Drop cached credential checks for a user (call after storing or revoking credentials)."""
+    with _cred_cache_lock:
+        for key in [key for key in _cred_cache if key[0] == user_id]:
+            _cred_cache.pop(key, None)
 
 
 def check_gcp_credentials(user_id: str, project_id: str = None) -> dict:
     """
     Check if user has valid GCP credentials.
 
+    VALID results are cached in-process for up to 60 seconds; tokens within
+    60 seconds of expiry are refreshed up front, so a cached result never
+    outlives its token.
+
     Args:
         user_id: User's Clerk ID
         project_id: Optional specific project to check
@@ -76,6 +115,31 @@ def check_gcp_credentials(user_id: str, project_id: str = None) -> dict:
             - message: str (user-friendly message)
             - project_id: str (if found)
     """
+    key = (user_id, project_id or "")
+    with _cred_cache_lock:
+        cached = _cred_cache.get(key)
+        if cached and time.monotonic() < cached[0]:
+            _cred_cache.move_to_end(key)
+            # Callers may annotate the result - never hand out the cached dict itself
+            return dict(cached[1])
+
+        # Expired or missing entry - anything other than VALID must not linger
+        _cred_cache.pop(key, None)
+
+    result = _check_gcp_credentials(user_id, project_id)
+    if result["status"] == CredentialStatus.VALID:
+        with _cred_cache_lock:
+            _cred_cache[key] = (time.monotonic() + _CRED_CACHE_TTL_SECONDS, dict(result))
+            _cred_cache.move_to_end(key)
+            if len(_cred_cache) > _CRED_CACHE_SIZE:
+                _cred_cache.popitem(last=False)
+    return result
+
+
+def _check_gcp_credentials(user_id: str, project_id: str = None) -> dict:
+    """Uncached credential check - see check_gcp_credentials."""
+    now_utc = datetime.now(_UTC)
+
     try:
         # Get credentials from database
         if project_id:
@@ -106,55 +170,23 @@ def check_gcp_credentials(user_id: str, project_id: str = None) -> dict:
         logger.info(f"Token expiry: {token_expiry}")
 
         if token_expiry:
-            # Parse token expiry (handle both datetime and string)
-            if isinstance(token_expiry, str):
-                # Parse ISO format string
-                from datetime import datetime as dt
-
-                token_expiry = dt.fromisoformat(token_expiry.replace("+00", "+00:00"))
-
-            # Make both timezone-aware for comparison
-            from datetime import timezone
-
-            if token_expiry.tzinfo:
-                now_utc = datetime.now(timezone.utc)
-            else:
-                now_utc = datetime.utcnow()
+            # token_expiry is selected as timestamptz - always an aware datetime
+            assert isinstance(token_expiry, datetime)
 
             logger.info(
                 f"Token expiry: {token_expiry}, Now: {now_utc}, Expired: {token_expiry <= now_utc}"
             )
 
-            # Check if token is expired
-            if token_expiry <= now_utc:
+            # Check if token is expired (or would expire while cached)
+            if token_expiry <= now_utc + _CACHE_MARGIN:
                 # Token is expired - try to refresh
                 try:
-                    credentials = _get_gcp_credentials(user_id, project_id)
+                    # The row already holds the encrypted tokens - no second SELECT
+                    credentials = _credentials_from_row(creds_row)
 
                     # Attempt refresh
                     if credentials.refresh_token:
-                        credentials.refresh(Request())
-
-                        # Update database with new token
-                        from src.utils.encryption import encrypt_value
-
-                        with supabase.get_connection() as conn:
-                            with conn.cursor() as cur:
-                                cur.execute(
-                                    """
-                                    UPDATE gcp_credentials
-                                    SET access_token = %s,
-                                        token_expiry = %s,
-                                        updated_at = NOW()
-                                    WHERE user_id = %s AND project_id = %s
-                                    """,
-                                    (
-                                        encrypt_value(credentials.token),
-                                        credentials.expiry,
-                                        user_id,
-                                        project_id,
-                                    ),
-                                )
+                        _refresh_and_store(credentials, user_id, project_id)
 
                         logger.info(f"Refreshed expired OAuth token for user {user_id}")
 
@@ -195,46 +227,18 @@ def check_gcp_credentials(user_id: str, project_id: str = None) -> dict:
 
         # If credentials haven't been refreshed in 50 minutes, they're likely expired
         if updated_at:
-            # Handle timezone-aware datetime from database
-            from datetime import timezone
-
-            if hasattr(updated_at, "tzinfo") and updated_at.tzinfo:
-                now_utc = datetime.now(timezone.utc)
-            else:
-                now_utc = datetime.utcnow()
-
+            # updated_at is a timestamptz column - always timezone-aware
             time_since_update = now_utc - updated_at
 
             # If older than 50 minutes, token is likely expired (they expire at 60 mins)
-            if time_since_update > timedelta(minutes=50):
+            if time_since_update > _REFRESH_THRESHOLD:
                 # Try to refresh
                 try:
-                    credentials = _get_gcp_credentials(user_id, project_id)
+                    credentials = _credentials_from_row(creds_row)
 
                     # Attempt refresh
                     if credentials.expired and credentials.refresh_token:
-                        credentials.refresh(Request())
-
-                        # Update database with new token
-                        from src.utils.encryption import encrypt_value
-
-                        with supabase.get_connection() as conn:
-                            with conn.cursor() as cur:
-                                cur.execute(
-                                    """
-                                    UPDATE gcp_credentials
-                                    SET access_token = %s,
-                                        token_expiry = %s,
-                                        updated_at = NOW()
-                                    WHERE user_id = %s AND project_id = %s
-                                    """,
-                                    (
-                                        encrypt_value(credentials.token),
-                                        credentials.expiry,
-                                        user_id,
-                                        project_id,
-                                    ),
-                                )
+                        _refresh_and_store(credentials, user_id, project_id)
 
                         logger.info(
                             f"Refreshed OAuth token for user {user_id}, project {project_id}"
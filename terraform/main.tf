@@ -56,7 +56,7 @@ resource "google_cloud_run_v2_service" "main" {
       # Health check configuration
       startup_probe {
         http_get {
-          path = "/api/v1/health"
+          path = "/api/v1/health/ready"
           port = 8000
         }
         initial_delay_seconds = 30
@@ -64,6 +64,16 @@ resource "google_cloud_run_v2_service" "main" {
         timeout_seconds       = 5
         failure_threshold     = 5
       }
+
+      liveness_probe {
+        http_get {
+          path = "/api/v1/health/live"
+          port = 8000
+        }
+        period_seconds    = 30
+        timeout_seconds   = 3
+        failure_threshold = 3
+      }
     }
     
     scaling {